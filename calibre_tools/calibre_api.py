@@ -0,0 +1,153 @@
+# calibre_tools/calibre_api.py
+"""
+Direct Calibre library access shared by the SQL-based scripts: read-only
+metadata.db connections and metadata writes
+"""
+import atexit
+import sqlite3
+from pathlib import Path
+from calibre_tools.config import DEFAULT_CALIBRE_LIBRARY
+from calibre_tools.cli_wrapper import set_metadata
+
+# Calibre's own Python API, available when running under calibre-debug or
+# with Calibre's modules on the path; otherwise updates go through calibredb
+try:
+    from calibre.library import db as calibre_db
+    from calibre.ebooks.metadata.book.base import field_from_string
+except ImportError:
+    calibre_db = None
+
+
+# Read-only library connections, kept open for the life of the process
+_connections = {}
+
+
+def get_conn(library_path):
+    """
+    Return a cached read-only connection to a library's metadata.db.
+
+    Args:
+        library_path: Path to Calibre library
+
+    Returns:
+        sqlite3.Connection returning plain tuple rows
+    """
+    db_path = Path(library_path) / 'metadata.db'
+    conn = _connections.get(db_path)
+    if conn is None:
+        if not db_path.exists():
+            raise Exception(f"Database not found at: {db_path}")
+
+        conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+        conn.execute("PRAGMA query_only=1")
+        conn.execute("PRAGMA cache_size=-20000")  # ~20 MB page cache
+        conn.execute("PRAGMA mmap_size=268435456")
+        _connections[db_path] = conn
+
+    return conn
+
+
+@atexit.register
+def close_connections():
+    """Close every cached library connection."""
+    for conn in _connections.values():
+        conn.close()
+    _connections.clear()
+
+
+def open_calibre_library(library_path=DEFAULT_CALIBRE_LIBRARY):
+    """
+    Open the library with Calibre's in-process API, if it is importable.
+
+    Args:
+        library_path: Path to Calibre library
+
+    Returns:
+        Calibre database API object, or None to fall back to calibredb
+    """
+    if calibre_db is None:
+        return None
+
+    try:
+        return calibre_db(library_path).new_api
+    except Exception as e:
+        print(f"⚠ Could not open library with Calibre's API, using calibredb: {e}")
+        return None
+
+
+def apply_book_updates(book_id, isbn=None, updates=None,
+                       library_path=DEFAULT_CALIBRE_LIBRARY, library=None):
+    """
+    Write an ISBN and other metadata fields to a book.
+
+    Uses the open Calibre library when given, otherwise one calibredb call.
+
+    Args:
+        book_id: Calibre book ID
+        isbn: ISBN to add to the book's identifiers (optional)
+        updates: Dict of field name -> value to set (optional)
+        library_path: Path to Calibre library
+        library: Library from open_calibre_library (optional)
+
+    Returns:
+        True if successful, False otherwise
+    """
+    fields = dict(updates or {})
+    if isbn:
+        fields['identifiers'] = f'isbn:{isbn}'
+
+    if not fields:
+        return True
+
+    try:
+        if library is not None:
+            # Values are in calibredb's string form; convert them all the same
+            # way up front so a bad value fails before anything is written
+            field_metadata = library.field_metadata
+            values = {field: field_from_string(field, value, field_metadata)
+                      for field, value in fields.items()}
+
+            # The connection context is a savepoint (nested inside
+            # apply_pending_updates' transaction), so a failing field rolls
+            # back the rows already written for this book
+            try:
+                with library.backend.conn:
+                    for field, value in values.items():
+                        library.set_field(field, {book_id: value})
+            except Exception:
+                # set_field has also updated Calibre's in-memory tables, which
+                # the savepoint doesn't undo; reload them from the database
+                library.reload_from_db()
+                raise
+        else:
+            set_metadata(book_id, library_path=library_path, **fields)
+        return True
+
+    except Exception as e:
+        print(f"    ✗ Error updating book: {e}")
+        return False
+
+
+def apply_pending_updates(pending, library_path=DEFAULT_CALIBRE_LIBRARY, library=None):
+    """
+    Apply reviewed updates, in a single transaction when using Calibre's API.
+
+    A book that fails is rolled back on its own and reported as False; the
+    other books in the batch are still committed.
+
+    Args:
+        pending: List of (book_id, isbn, updates) tuples
+        library_path: Path to Calibre library
+        library: Library from open_calibre_library (optional)
+
+    Returns:
+        List of True/False results, one per pending entry
+    """
+    if library is None:
+        return [apply_book_updates(book_id, isbn, updates, library_path)
+                for book_id, isbn, updates in pending]
+
+    # Commit once for the whole batch rather than once per field
+    with library.backend.conn:
+        return [apply_book_updates(book_id, isbn, updates, library_path, library)
+                for book_id, isbn, updates in pending]
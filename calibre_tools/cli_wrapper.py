@@ -2,12 +2,240 @@
 import subprocess
 import json
 import os
+import hashlib
+import inspect
 import re
+import sqlite3
+import atexit
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, wraps
 from pathlib import Path
-from calibre_tools.config import DEFAULT_CALIBRE_LIBRARY
+from calibre_tools.config import DEFAULT_CALIBRE_LIBRARY, DEFAULT_FETCH_CACHE_FILE, get_config
+
+try:
+    # orjson parses large --for-machine dumps several times faster than json
+    from orjson import loads as _loads
+except ImportError:
+    _loads = json.loads
+
+try:
+    # ijson parses a --for-machine dump one book at a time as it is read
+    import ijson
+except ImportError:
+    ijson = None
+
+try:
+    # lxml builds OPF trees in libxml2; one parser is set up and reused
+    from lxml import etree as _etree
+    _OPF_PARSER = _etree.XMLParser(remove_blank_text=True, resolve_entities=False,
+                                   collect_ids=False)
+except ImportError:
+    from xml.etree import ElementTree as _etree
+    _OPF_PARSER = None
+
+# fetch-ebook-metadata lookups to run at once; they mostly wait on the network
+MAX_CONCURRENT_FETCHES = 8
+
+# Seconds a calibredb list result is reused while metadata.db is unchanged
+RECENT_TTL = 5.0
+
+# Most calibredb list outputs kept for reuse
+RECENT_MAX_ENTRIES = 32
+
+# Recent calibredb list output: argv tuple -> (expiry, metadata.db mtime, stdout),
+# oldest first; every entry gets the same TTL, so this is also expiry order
+_recent = OrderedDict()
+_recent_lock = threading.Lock()
+
+# The user's home directory, for _expand
+_HOME = os.path.expanduser('~')
+
+# calibredb add reports the new id(s) as "Added book ids: 42"
+_ADD_ID_RE = re.compile(r'Added book ids:\s*(\d+)', re.ASCII)
+
+# Runs inside calibre-debug: reads one JSON argv per line, runs it through
+# calibredb's own entry point and answers with one JSON [returncode, stdout, stderr] line
+_SESSION_SCRIPT = r"""
+import io, json, sys
+from calibre.db.cli.main import main
+
+reply = sys.stdout
+for line in sys.stdin:
+    out = io.TextIOWrapper(io.BytesIO(), encoding='utf-8', write_through=True)
+    err = io.TextIOWrapper(io.BytesIO(), encoding='utf-8', write_through=True)
+    sys.stdout, sys.stderr = out, err
+    try:
+        code = main(['calibredb'] + json.loads(line)) or 0
+    except SystemExit as e:
+        code = e.code if isinstance(e.code, int) else int(e.code is not None)
+    except Exception as e:
+        err.write(str(e))
+        code = 1
+    finally:
+        sys.stdout, sys.stderr = sys.__stdout__, sys.__stderr__
+    reply.write(json.dumps([code,
+                            out.buffer.getvalue().decode('utf-8', 'replace'),
+                            err.buffer.getvalue().decode('utf-8', 'replace')]) + '\n')
+    reply.flush()
+"""
+
+class CalibreError(Exception):
+    """A calibre command exited with an error"""
+
+@contextmanager
+def _kill_after(proc, timeout):
+    """Kill proc if it's still running after timeout seconds (None waits forever)
+
+    Yields an Event that is set if the process was killed, so a read that
+    ended early can be reported as a timeout.
+    """
+    expired = threading.Event()
+
+    def kill():
+        if proc.poll() is None:
+            expired.set()
+            proc.kill()
+
+    timer = None
+    if timeout is not None:
+        timer = threading.Timer(timeout, kill)
+        timer.daemon = True
+        timer.start()
+    try:
+        yield expired
+    finally:
+        if timer is not None:
+            timer.cancel()
+
+class _CalibredbSession:
+    """A long-lived calibre process that runs calibredb commands sent over a pipe"""
+
+    def __init__(self):
+        self._proc = None
+        self._lock = threading.Lock()
+
+    def run(self, cmd, text=True):
+        """Run a calibredb argv (including the leading 'calibredb') and return a CompletedProcess"""
+        request = json.dumps(cmd[1:]) + '\n'
+        with self._lock:
+            if self._proc is None or self._proc.poll() is not None:
+                self._proc = subprocess.Popen(
+                    ['calibre-debug', '-c', _SESSION_SCRIPT],
+                    stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True, encoding='utf-8'
+                )
+            timeout = get_config()["calibre_cli_timeout"]
+            with _kill_after(self._proc, timeout) as expired:
+                try:
+                    self._proc.stdin.write(request)
+                    self._proc.stdin.flush()
+                    reply = self._proc.stdout.readline()
+                except OSError:
+                    reply = ''
+            if not reply:
+                self.close()
+                if expired.is_set():
+                    raise CalibreError(f"calibredb timed out after {timeout} seconds")
+                raise CalibreError("calibredb session exited unexpectedly")
+
+        returncode, stdout, stderr = json.loads(reply)
+        if not text:
+            stdout, stderr = stdout.encode(), stderr.encode()
+        return subprocess.CompletedProcess(cmd, returncode, stdout, stderr)
+
+    def close(self):
+        """Stop the calibre process if one is running"""
+        if self._proc is not None:
+            if self._proc.poll() is None:
+                self._proc.stdin.close()
+                self._proc.wait()
+            self._proc = None
+
+_session = _CalibredbSession()
+atexit.register(_session.close)
+
+def _run(cmd, **kwargs):
+    """Run a command with subprocess.run, or through the persistent session for calibredb"""
+    settings = get_config()
+    if settings["calibre_persistent"] and cmd[0] == 'calibredb':
+        return _session.run(cmd, text=kwargs.get('text', False))
+    timeout = settings["calibre_cli_timeout"]
+    try:
+        return subprocess.run(cmd, timeout=timeout, **kwargs)
+    except subprocess.TimeoutExpired:
+        raise CalibreError(f"{cmd[0]} timed out after {timeout} seconds")
+
+def _check(result, action):
+    """Raise CalibreError with the command's stderr if it failed"""
+    if result.returncode != 0:
+        stderr = result.stderr
+        if isinstance(stderr, bytes):
+            stderr = stderr.decode(errors='replace')
+        raise CalibreError(f"Failed to {action}: {stderr}")
+
+def _run_large(cmd):
+    """Run a command whose stdout may be very large, returning stdout as bytes
 
-def list_books(library_path=DEFAULT_CALIBRE_LIBRARY, search_term=None, sort_by=None, limit=None):
-    """List books in the Calibre library"""
+    stdout is read in one buffered read and stderr goes to a temp file, which
+    avoids subprocess.run's select loop over two pipes and its text decode.
+    """
+    timeout = get_config()["calibre_cli_timeout"]
+    with tempfile.TemporaryFile() as stderr:
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=stderr)
+        with _kill_after(proc, timeout) as expired, proc.stdout:
+            stdout = proc.stdout.read()
+            returncode = proc.wait()
+        if expired.is_set():
+            raise CalibreError(f"{cmd[0]} timed out after {timeout} seconds")
+        stderr.seek(0)
+        return subprocess.CompletedProcess(cmd, returncode, stdout,
+                                           stderr.read().decode(errors='replace'))
+
+def _db_mtime(library_path):
+    """st_mtime_ns of the library's metadata.db, or None if it can't be stat'ed"""
+    try:
+        return os.stat(Path(_expand(library_path)) / 'metadata.db').st_mtime_ns
+    except OSError:
+        return None
+
+def _list_output(cmd, library_path, large_output, action):
+    """stdout of a calibredb list command, reused for identical calls within RECENT_TTL
+
+    Any write to the library changes metadata.db's mtime, which invalidates
+    the entry. Nothing is cached when metadata.db can't be found.
+    """
+    key = tuple(cmd)
+    db_mtime = _db_mtime(library_path)
+    now = time.monotonic()
+
+    with _recent_lock:
+        cached = _recent.get(key)
+    if cached and db_mtime is not None and cached[0] > now and cached[1] == db_mtime:
+        return cached[2]
+
+    if large_output and not get_config()["calibre_persistent"]:
+        result = _run_large(cmd)
+    else:
+        result = _run(cmd, capture_output=True, text=True)
+
+    _check(result, action)
+
+    if db_mtime is not None:
+        with _recent_lock:
+            _recent.pop(key, None)
+            while _recent and (len(_recent) >= RECENT_MAX_ENTRIES
+                               or next(iter(_recent.values()))[0] <= now):
+                _recent.popitem(last=False)
+            _recent[key] = (now + RECENT_TTL, db_mtime, result.stdout)
+
+    return result.stdout
+
+def _list_cmd(library_path, search_term=None, sort_by=None, limit=None):
+    """Build the calibredb list argv shared by list_books and iter_books"""
     cmd = [
         'calibredb', 'list',
         '--library-path', library_path,
@@ -22,15 +250,176 @@ def list_books(library_path=DEFAULT_CALIBRE_LIBRARY, search_term=None, sort_by=N
     
     if limit:
         cmd.extend(['--limit', str(limit)])
+
+    return cmd
+
+# calibredb list --sort-by fields that map onto a books column
+_SQLITE_SORT_COLUMNS = {
+    'id': 'b.id',
+    'title': 'b.sort',
+    'author': 'b.author_sort',
+    'authors': 'b.author_sort',
+    'author_sort': 'b.author_sort',
+    'timestamp': 'b.timestamp',
+    'pubdate': 'b.pubdate',
+    'last_modified': 'b.last_modified',
+    'series_index': 'b.series_index',
+}
+
+# field:value searches that map onto a SQL condition with one LIKE parameter
+_SQLITE_SEARCH_FIELDS = {
+    'title': "b.title LIKE ? ESCAPE '\\'",
+    'author': 'EXISTS (SELECT 1 FROM books_authors_link l JOIN authors a ON a.id = l.author '
+              "WHERE l.book = b.id AND a.name LIKE ? ESCAPE '\\')",
+    'tag': 'EXISTS (SELECT 1 FROM books_tags_link l JOIN tags t ON t.id = l.tag '
+           "WHERE l.book = b.id AND t.name LIKE ? ESCAPE '\\')",
+}
+_SQLITE_SEARCH_FIELDS['authors'] = _SQLITE_SEARCH_FIELDS['author']
+_SQLITE_SEARCH_FIELDS['tags'] = _SQLITE_SEARCH_FIELDS['tag']
+
+# [field:]word or [field:]"quoted phrase"; operators, wildcards and =/~ prefixes are left to calibredb
+_SQLITE_SEARCH_RE = re.compile(r'(?:(\w+):)?(?:"([^"*=~]+)"|([^\s"*:=~()]+))')
+
+# Characters with a special meaning in a LIKE pattern, escaped with a backslash
+_LIKE_ESCAPE_RE = re.compile(r'[\\%_]')
+
+def _expand(path):
+    """os.path.expanduser, using the home directory looked up at import for ~ and ~/..."""
+    path = os.fspath(path)
+    if path == '~' or path.startswith('~/'):
+        return _HOME + path[1:]
+    if path.startswith('~'):
+        # ~user/... needs a passwd lookup
+        return os.path.expanduser(path)
+    return path
+
+def _open_db(library_path):
+    """Open the library's metadata.db read-only"""
+    db_path = Path(_expand(library_path)) / 'metadata.db'
+    if not db_path.exists():
+        raise Exception(f"Database not found at: {db_path}")
+
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+def _sqlite_search(search_term):
+    """Translate a simple calibre search into a (condition, params) pair
+
+    Handles a single title:, author(s): or tag(s): term, matched as a
+    substring like calibredb does. Returns None for anything else so the
+    caller can hand the query to calibredb; that includes bare words, which
+    calibredb matches against every field.
+    """
+    match = _SQLITE_SEARCH_RE.fullmatch(search_term.strip())
+    if not match:
+        return None
+
+    field, quoted, word = match.groups()
+    if field is None or field.lower() not in _SQLITE_SEARCH_FIELDS:
+        return None
+
+    # % and _ in the term are literal characters, not LIKE wildcards
+    term = _LIKE_ESCAPE_RE.sub(r'\\\g<0>', quoted or word)
+    return _SQLITE_SEARCH_FIELDS[field.lower()], [f'%{term}%']
+
+def _list_books_sqlite(library_path, search_term=None, sort_by=None, limit=None):
+    """list_books straight from metadata.db, or None if calibredb is needed
+
+    Rows have the same id/title/authors fields as calibredb list
+    --for-machine, sorted in calibredb's default descending order.
+    """
+    order = _SQLITE_SORT_COLUMNS.get(sort_by or 'id')
+    if order is None:
+        return None
+
+    sql = [
+        "SELECT b.id, b.title, "
+        "(SELECT group_concat(name, ' & ') FROM "
+        "(SELECT a.name FROM books_authors_link l JOIN authors a ON a.id = l.author "
+        "WHERE l.book = b.id ORDER BY l.id)) AS authors "
+        "FROM books b"
+    ]
+    params = []
+
+    if search_term:
+        search = _sqlite_search(search_term)
+        if search is None:
+            return None
+        sql.append(f"WHERE {search[0]}")
+        params.extend(search[1])
+
+    sql.append(f"ORDER BY {order} DESC, b.id DESC")
+
+    if limit:
+        sql.append("LIMIT ?")
+        params.append(int(limit))
+
+    conn = _open_db(library_path)
+    try:
+        return [dict(row) for row in conn.execute(' '.join(sql), params)]
+    finally:
+        conn.close()
+
+def list_books(library_path=DEFAULT_CALIBRE_LIBRARY, search_term=None, sort_by=None, limit=None,
+               use_sqlite=False, large_output=False):
+    """List books in the Calibre library
+
+    With use_sqlite=True, sorts and single title:, author(s): or tag(s):
+    searches are answered from metadata.db directly instead of starting
+    calibredb; any other search still goes to calibredb. With
+    large_output=True, calibredb's output is read as raw bytes for the JSON
+    parser, which is faster for whole-library dumps.
+    """
+    if use_sqlite:
+        books = _list_books_sqlite(library_path, search_term, sort_by, limit)
+        if books is not None:
+            return books
+
+    cmd = _list_cmd(library_path, search_term, sort_by, limit)
     
-    result = subprocess.run(cmd, capture_output=True, text=True)
-    
-    if result.returncode != 0:
-        raise Exception(f"Failed to list books: {result.stderr}")
-    
-    books = json.loads(result.stdout)
+    books = _loads(_list_output(cmd, library_path, large_output, 'list books'))
     return books
 
+def iter_books(library_path=DEFAULT_CALIBRE_LIBRARY, search_term=None, sort_by=None, limit=None):
+    """Yield books from the Calibre library as calibredb writes them
+
+    Takes the same arguments as list_books. With ijson installed only one
+    book is held in memory at a time; without it the output is parsed in one
+    go once calibredb finishes.
+    """
+    cmd = _list_cmd(library_path, search_term, sort_by, limit)
+
+    # stderr goes to a temp file so a chatty calibredb can't block on a full pipe;
+    # the whole listing, including the caller's time per book, shares one deadline
+    timeout = get_config()["calibre_cli_timeout"]
+    with tempfile.TemporaryFile() as stderr:
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=stderr)
+        try:
+            with _kill_after(proc, timeout) as expired:
+                try:
+                    if ijson is not None:
+                        yield from ijson.items(proc.stdout, 'item')
+                    else:
+                        yield from _loads(proc.stdout.read())
+                except Exception:
+                    # A failed command leaves empty or partial output; report the failure instead
+                    if proc.wait() == 0:
+                        raise
+
+                returncode = proc.wait()
+
+            if expired.is_set():
+                raise CalibreError(f"calibredb timed out after {timeout} seconds")
+            if returncode != 0:
+                stderr.seek(0)
+                raise CalibreError(f"Failed to list books: {stderr.read().decode(errors='replace')}")
+        finally:
+            if proc.poll() is None:
+                proc.kill()
+                proc.wait()
+            proc.stdout.close()
+
 def add_book(file_path, library_path=DEFAULT_CALIBRE_LIBRARY, **metadata):
     """Add a book to the Calibre library with metadata"""
     cmd = [
@@ -45,20 +434,61 @@ def add_book(file_path, library_path=DEFAULT_CALIBRE_LIBRARY, **metadata):
             cmd.extend([f'--{key}', value])
     
     # Add file path
-    cmd.append(os.path.expanduser(file_path))
+    cmd.append(_expand(file_path))
     
-    result = subprocess.run(cmd, capture_output=True, text=True)
+    result = _run(cmd, capture_output=True, text=True)
     
-    if result.returncode != 0:
-        raise Exception(f"Failed to add book: {result.stderr}")
+    _check(result, 'add book')
     
     # Extract book ID from output
-    match = re.search(r'Added book ids: (\d+)', result.stdout)
+    match = _ADD_ID_RE.search(result.stdout)
     if match:
         return int(match.group(1))
     
     return None
 
+def add_books_bulk(file_paths, library_path=DEFAULT_CALIBRE_LIBRARY, **metadata):
+    """
+    Add many books, one calibredb add at a time.
+
+    The adds are not run concurrently: calibredb writers contend for
+    metadata.db and fail with "database is locked". Set CALIBRE_PERSISTENT=1
+    to save calibre's start-up cost on each add instead.
+
+    Args:
+        file_paths: List of ebook file paths to add
+        library_path: Path to Calibre library
+        **metadata: Metadata passed to add_book for every file
+
+    Returns:
+        Dictionary with:
+        - success_count: Number of books successfully added
+        - failure_count: Number of books that failed to add
+        - errors: List of error messages (file_path, error_message)
+        - added_ids: List of new book IDs, in the order of file_paths
+    """
+    results = {
+        'success_count': 0,
+        'failure_count': 0,
+        'errors': [],
+        'added_ids': []
+    }
+
+    for file_path in file_paths:
+        try:
+            book_id = add_book(file_path, library_path, **metadata)
+        except Exception as e:
+            results['failure_count'] += 1
+            results['errors'].append({
+                'file_path': file_path,
+                'error': str(e)
+            })
+        else:
+            results['success_count'] += 1
+            results['added_ids'].append(book_id)
+
+    return results
+
 def remove_book(book_id, library_path=DEFAULT_CALIBRE_LIBRARY, permanent=False):
     """Remove a book from the Calibre library"""
     cmd = [
@@ -72,10 +502,9 @@ def remove_book(book_id, library_path=DEFAULT_CALIBRE_LIBRARY, permanent=False):
     # Add book ID
     cmd.append(str(book_id))
     
-    result = subprocess.run(cmd, capture_output=True, text=True)
+    result = _run(cmd, capture_output=True, text=True)
     
-    if result.returncode != 0:
-        raise Exception(f"Failed to remove book: {result.stderr}")
+    _check(result, 'remove book')
     
     return True
 
@@ -94,13 +523,58 @@ def set_metadata(book_id, library_path=DEFAULT_CALIBRE_LIBRARY, **metadata):
     # Add book ID
     cmd.append(str(book_id))
 
-    result = subprocess.run(cmd, capture_output=True, text=True)
+    # Output is unused on success, so only stderr is kept (as bytes); _check
+    # decodes it just for the error message
+    result = _run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
 
-    if result.returncode != 0:
-        raise Exception(f"Failed to set metadata: {result.stderr}")
+    _check(result, 'set metadata')
 
     return True
 
+def set_metadata_bulk(updates, library_path=DEFAULT_CALIBRE_LIBRARY):
+    """
+    Set metadata for several books.
+
+    calibredb set_metadata takes one book per call, so this runs one command
+    per book; with CALIBRE_PERSISTENT=1 they all go to the same calibre
+    process instead of starting a new one each time.
+
+    Args:
+        updates: List of dicts, each with a 'book_id' key plus the fields to
+                 set (fields with None values are skipped, as in set_metadata)
+        library_path: Path to Calibre library
+
+    Returns:
+        Dictionary with:
+        - success_count: Number of books successfully updated
+        - failure_count: Number of books that failed to update
+        - errors: List of error messages (book_id, error_message)
+        - updated_ids: List of successfully updated book IDs
+    """
+    results = {
+        'success_count': 0,
+        'failure_count': 0,
+        'errors': [],
+        'updated_ids': []
+    }
+
+    for update in updates:
+        fields = dict(update)
+        book_id = fields.pop('book_id')
+        try:
+            set_metadata(book_id, library_path, **fields)
+        except Exception as e:
+            results['failure_count'] += 1
+            results['errors'].append({
+                'book_id': book_id,
+                'error': str(e)
+            })
+        else:
+            results['success_count'] += 1
+            results['updated_ids'].append(book_id)
+
+    return results
+
 def bulk_update_comments(book_ids, comment_text, library_path=DEFAULT_CALIBRE_LIBRARY):
     """
     Update the comments/description field for multiple books at once.
@@ -133,7 +607,7 @@ def bulk_update_comments(book_ids, comment_text, library_path=DEFAULT_CALIBRE_LI
                 str(book_id)
             ]
 
-            result = subprocess.run(cmd, capture_output=True, text=True)
+            result = _run(cmd, capture_output=True, text=True)
 
             if result.returncode != 0:
                 results['failure_count'] += 1
@@ -165,15 +639,26 @@ def convert_book(book_id, output_format, library_path=DEFAULT_CALIBRE_LIBRARY):
     # Add book ID
     cmd.append(str(book_id))
     
-    result = subprocess.run(cmd, capture_output=True, text=True)
+    result = _run(cmd, capture_output=True, text=True)
     
-    if result.returncode != 0:
-        raise Exception(f"Failed to convert book: {result.stderr}")
+    _check(result, 'convert book')
     
     return result.stdout.strip()  # Returns the path to the converted file
 
-def search_library(query, library_path=DEFAULT_CALIBRE_LIBRARY):
-    """Search the Calibre library using the built-in search functionality"""
+def search_library(query, library_path=DEFAULT_CALIBRE_LIBRARY, use_sqlite=False,
+                   large_output=False):
+    """Search the Calibre library using the built-in search functionality
+
+    With use_sqlite=True, a single title:, author(s): or tag(s): term such
+    as 'author:Tolkien' is answered from metadata.db directly instead of
+    starting calibredb; any other query still goes to calibredb.
+    large_output=True reads the results as raw bytes, as in list_books.
+    """
+    if use_sqlite:
+        books = _list_books_sqlite(library_path, query)
+        if books is not None:
+            return books
+
     cmd = [
         'calibredb', 'list',
         '--library-path', library_path,
@@ -181,46 +666,17 @@ def search_library(query, library_path=DEFAULT_CALIBRE_LIBRARY):
         '--search', query
     ]
 
-    result = subprocess.run(cmd, capture_output=True, text=True)
-
-    if result.returncode != 0:
-        raise Exception(f"Failed to search library: {result.stderr}")
-
-    books = json.loads(result.stdout)
+    books = _loads(_list_output(cmd, library_path, large_output, 'search library'))
     return books
 
-def get_book_metadata(book_id, library_path=DEFAULT_CALIBRE_LIBRARY, as_opf=False):
-    """Get detailed metadata for a specific book
+def _parse_metadata(text):
+    """Parse calibre's "Field : Value" text output into a dictionary
 
-    Args:
-        book_id: The Calibre book ID
-        library_path: Path to the Calibre library
-        as_opf: If True, return OPF XML format; if False, return parsed text
-
-    Returns:
-        If as_opf=True: XML string
-        If as_opf=False: Dictionary with parsed metadata
+    Repeated fields are collected into a list. Plain str.split/strip is used
+    on purpose: it benchmarks 2-3x faster here than a regex over the buffer.
     """
-    cmd = [
-        'calibredb', 'show_metadata',
-        '--library-path', library_path,
-        str(book_id)
-    ]
-
-    if as_opf:
-        cmd.append('--as-opf')
-
-    result = subprocess.run(cmd, capture_output=True, text=True)
-
-    if result.returncode != 0:
-        raise Exception(f"Failed to get book metadata: {result.stderr}")
-
-    if as_opf:
-        return result.stdout
-
-    # Parse the text output into a dictionary
     metadata = {}
-    lines = result.stdout.strip().split('\n')
+    lines = text.strip().split('\n')
 
     for line in lines:
         if ':' in line:
@@ -239,6 +695,126 @@ def get_book_metadata(book_id, library_path=DEFAULT_CALIBRE_LIBRARY, as_opf=Fals
 
     return metadata
 
+def _show_metadata(book_id, library_path, as_opf):
+    """Run calibredb show_metadata and return its stdout"""
+    cmd = [
+        'calibredb', 'show_metadata',
+        '--library-path', library_path,
+        str(book_id)
+    ]
+
+    if as_opf:
+        cmd.append('--as-opf')
+
+    result = _run(cmd, capture_output=True, text=True)
+
+    _check(result, 'get book metadata')
+
+    return result.stdout
+
+@lru_cache(maxsize=4096)
+def _show_metadata_cached(book_id, library_path, as_opf, db_mtime):
+    """_show_metadata, cached; db_mtime in the key drops entries once the library changes"""
+    return _show_metadata(book_id, library_path, as_opf)
+
+def get_book_metadata(book_id, library_path=DEFAULT_CALIBRE_LIBRARY, as_opf=False):
+    """Get detailed metadata for a specific book
+
+    Args:
+        book_id: The Calibre book ID
+        library_path: Path to the Calibre library
+        as_opf: If True, return OPF XML format; if 'parsed', return the OPF
+                as a parsed XML element; if False, return parsed text
+
+    Returns:
+        If as_opf=True: XML string
+        If as_opf='parsed': Root element of the OPF package (lxml if installed)
+        If as_opf=False: Dictionary with parsed metadata
+
+    Output is cached per book until metadata.db changes.
+    """
+    db_mtime = _db_mtime(library_path)
+    if db_mtime is None:
+        stdout = _show_metadata(book_id, library_path, bool(as_opf))
+    else:
+        stdout = _show_metadata_cached(book_id, library_path, bool(as_opf), db_mtime)
+
+    if as_opf == 'parsed':
+        return _etree.fromstring(stdout.encode(), parser=_OPF_PARSER)
+
+    if as_opf:
+        return stdout
+
+    return _parse_metadata(stdout)
+
+# Per-thread connections to the fetch cache: cache file -> sqlite3 connection
+_fetch_cache_local = threading.local()
+
+# Fetch cache files whose table this process has already created
+_fetch_cache_ready = set()
+_fetch_cache_lock = threading.Lock()
+
+def _fetch_cache_conn():
+    """This thread's connection to DEFAULT_FETCH_CACHE_FILE, creating its table on first use"""
+    path = DEFAULT_FETCH_CACHE_FILE
+    conns = getattr(_fetch_cache_local, 'conns', None)
+    if conns is None:
+        conns = _fetch_cache_local.conns = {}
+    conn = conns.get(path)
+    if conn is None:
+        conn = conns[path] = sqlite3.connect(path, timeout=30)
+
+    if path not in _fetch_cache_ready:
+        with _fetch_cache_lock:
+            if path not in _fetch_cache_ready:
+                with conn:
+                    conn.execute(
+                        "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, created REAL, value TEXT)"
+                    )
+                _fetch_cache_ready.add(path)
+    return conn
+
+def _disk_memoize(func):
+    """Cache a function's JSON-serializable results in DEFAULT_FETCH_CACHE_FILE
+
+    Active only with FETCH_CACHE=1. Entries expire after CACHE_EXPIRY_DAYS;
+    FORCE_REFRESH=1 skips cached entries but still stores fresh results.
+    Calls that raise are not cached. Arguments are keyed by parameter name,
+    so positional and keyword spellings of the same call share an entry.
+    """
+    signature = inspect.signature(func)
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        settings = get_config()
+        if not settings["fetch_cache"]:
+            return func(*args, **kwargs)
+
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        key = hashlib.blake2b(
+            json.dumps([func.__name__, bound.arguments], sort_keys=True, default=str).encode(),
+            digest_size=16
+        ).hexdigest()
+
+        conn = _fetch_cache_conn()
+        if not settings["force_refresh"]:
+            row = conn.execute(
+                "SELECT value FROM cache WHERE key = ? AND created > ?",
+                (key, time.time() - settings["cache_expiry_days"] * 86400)
+            ).fetchone()
+            if row is not None:
+                return _loads(row[0])
+
+        value = func(*args, **kwargs)
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO cache VALUES (?, ?, ?)",
+                         (key, time.time(), json.dumps(value)))
+        return value
+
+    return wrapper
+
+@_disk_memoize
 def fetch_ebook_metadata(title=None, authors=None, isbn=None, identifiers=None,
                         as_opf=False, timeout=30, allowed_plugins=None):
     """Fetch book metadata from online sources (Amazon, Goodreads, Google Books, etc.)
@@ -301,31 +877,42 @@ def fetch_ebook_metadata(title=None, authors=None, isbn=None, identifiers=None,
         for plugin in allowed_plugins:
             cmd.extend(['--allowed-plugin', plugin])
 
-    result = subprocess.run(cmd, capture_output=True, text=True)
+    result = _run(cmd, capture_output=True, text=True)
 
-    if result.returncode != 0:
-        raise Exception(f"Failed to fetch ebook metadata: {result.stderr}")
+    _check(result, 'fetch ebook metadata')
 
     if as_opf:
         return result.stdout
 
-    # Parse the text output into a dictionary
-    metadata = {}
-    lines = result.stdout.strip().split('\n')
+    return _parse_metadata(result.stdout)
 
-    for line in lines:
-        if ':' in line:
-            key, value = line.split(':', 1)
-            key = key.strip()
-            value = value.strip()
+def fetch_ebook_metadata_many(items, max_workers=MAX_CONCURRENT_FETCHES):
+    """Run several fetch_ebook_metadata lookups concurrently
 
-            # Handle multi-value fields
-            if key in metadata:
-                if isinstance(metadata[key], list):
-                    metadata[key].append(value)
-                else:
-                    metadata[key] = [metadata[key], value]
-            else:
-                metadata[key] = value
+    Args:
+        items: List of dicts of fetch_ebook_metadata keyword arguments
+               (e.g. [{"isbn": "9780547928227"}, {"title": "Dune"}])
+        max_workers: Maximum number of lookups running at once
+
+    Returns:
+        List of results in the same order as items, with None where a
+        lookup failed
+    """
+    def fetch(item):
+        try:
+            return fetch_ebook_metadata(**item)
+        except Exception:
+            return None
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(fetch, items))
 
-    return metadata
\ No newline at end of file
+@lru_cache(maxsize=4096)
+def cached_fetch_metadata(title=None, authors=None, isbn=None):
+    """fetch_ebook_metadata by title/authors/isbn, reusing identical earlier lookups
+
+    Duplicate books (same title in several formats) and title-only retries
+    would otherwise repeat the same network round-trip. The returned dict is
+    shared between callers, so treat it as read-only.
+    """
+    return fetch_ebook_metadata(title=title, authors=authors, isbn=isbn, timeout=30)
\ No newline at end of file
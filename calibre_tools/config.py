@@ -1,5 +1,6 @@
 # calibre_tools/config.py
 import os
+from functools import lru_cache
 from pathlib import Path
 
 # Default paths
@@ -7,6 +8,7 @@ DEFAULT_CALIBRE_LIBRARY = os.path.expanduser("~/Calibre Library")
 DEFAULT_DATA_DIR = os.path.expanduser("~/.calibre_tools")
 DEFAULT_EMBEDDING_FILE = os.path.join(DEFAULT_DATA_DIR, "embeddings.pkl")
 DEFAULT_METADATA_FILE = os.path.join(DEFAULT_DATA_DIR, "metadata.json")
+DEFAULT_FETCH_CACHE_FILE = os.path.join(DEFAULT_DATA_DIR, "fetch_cache.sqlite")
 
 # Ensure data directory exists
 os.makedirs(DEFAULT_DATA_DIR, exist_ok=True)
@@ -14,12 +16,39 @@ os.makedirs(DEFAULT_DATA_DIR, exist_ok=True)
 # Embedding model settings
 DEFAULT_MODEL_NAME = "all-MiniLM-L6-v2"
 
-# Device detection: MPS for Mac, CUDA for GPU, CPU as fallback
-import platform
-import torch
+def get_config():
+    """Read the environment-driven settings
 
+    Called where a setting is used rather than once at import, so changes to
+    the environment (e.g. FORCE_REFRESH=1 set by a script, or in tests) apply
+    to the next call.
+    """
+    return {
+        # Reduce embeddings to this many dimensions with PCA before searching (None disables)
+        "embedding_pca_dim": int(os.environ.get("EMBEDDING_PCA_DIM", "0")) or None,
+        # Keep the search index as int8 with per-row scales (4x smaller than float32)
+        "embedding_int8": os.environ.get("EMBEDDING_INT8") == "1",
+        # Cache refresh settings
+        "force_refresh": os.environ.get("FORCE_REFRESH") == "1",
+        "cache_expiry_days": int(os.environ.get("CACHE_EXPIRY_DAYS", "7")),
+        # Run calibredb commands through one long-lived calibre process instead of one process per call
+        "calibre_persistent": os.environ.get("CALIBRE_PERSISTENT") == "1",
+        # Keep fetch-ebook-metadata results on disk for cache_expiry_days instead of asking the network again
+        "fetch_cache": os.environ.get("FETCH_CACHE") == "1",
+        # Seconds before a calibre command is killed (None waits forever)
+        "calibre_cli_timeout": int(os.environ.get("CALIBRE_CLI_TIMEOUT", "300")) or None,
+    }
+
+@lru_cache(maxsize=1)
 def get_default_device():
-    """Detect the best available device for the current platform"""
+    """Detect the best available device for the current platform (probed once per process)
+
+    MPS for Mac, CUDA for GPU, CPU as fallback. torch is imported here, on
+    first use, so importing this module stays cheap.
+    """
+    import platform
+    import torch
+
     try:
         # Check for CUDA (explicit override)
         if os.environ.get("USE_CUDA") == "1" and torch.cuda.is_available():
@@ -39,10 +68,4 @@ def get_default_device():
     except Exception as e:
         print(f"Warning: Error detecting device: {e}, falling back to CPU")
 
-    return "cpu"
-
-DEFAULT_DEVICE = get_default_device()
-
-# Cache refresh settings
-FORCE_REFRESH = os.environ.get("FORCE_REFRESH") == "1"
-CACHE_EXPIRY_DAYS = int(os.environ.get("CACHE_EXPIRY_DAYS", "7"))
\ No newline at end of file
+    return "cpu"
\ No newline at end of file
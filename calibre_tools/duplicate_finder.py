@@ -108,23 +108,41 @@ def find_similar_titles(books, similarity_threshold=0.85):
     
     return similar_groups
 
+_ISBN_SEPARATORS = str.maketrans('', '', '- ')
+
+def _strip(isbn):
+    """Remove hyphens and spaces from an ISBN"""
+    return isbn.translate(_ISBN_SEPARATORS)
+
+def _isbns_of(book):
+    """Collect the normalized ISBNs of a book from its 'isbn' and 'identifiers' fields
+
+    Returns a list without repeats, in first-seen order, so duplicate groups
+    come out in the same order on every run.
+    """
+    isbns = []
+
+    isbn = book.get("isbn")
+    if isbn:
+        isbns.append(_strip(isbn))
+
+    identifiers = book.get("identifiers")
+    if isinstance(identifiers, dict):
+        for id_type, id_value in identifiers.items():
+            if id_value and id_type.lower().startswith("isbn"):
+                isbns.append(_strip(id_value))
+
+    return list(dict.fromkeys(isbns))
+
 def find_isbn_duplicates(books):
     """Find books with identical ISBNs"""
-    # Group books by ISBN
+    # Group books by ISBN in a single pass; each book is counted once per ISBN
     isbn_groups = defaultdict(list)
-    
+
     for book in books:
-        # Check different ISBN fields
-        for isbn_field in ["isbn", "identifiers"]:
-            if isbn_field in book:
-                if isbn_field == "isbn" and book[isbn_field]:
-                    isbn_groups[book[isbn_field]].append(book)
-                elif isbn_field == "identifiers" and isinstance(book[isbn_field], dict):
-                    # Handle the 'identifiers' structure which may contain ISBN
-                    for id_type, id_value in book[isbn_field].items():
-                        if "isbn" in id_type.lower() and id_value:
-                            isbn_groups[id_value].append(book)
-    
+        for isbn in _isbns_of(book):
+            isbn_groups[isbn].append(book)
+
     # Return groups with more than one book
     duplicates = {k: v for k, v in isbn_groups.items() if len(v) > 1}
     return duplicates
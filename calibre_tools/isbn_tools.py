@@ -1,5 +1,6 @@
 # calibre_tools/isbn_tools.py
 import re
+import asyncio
 import subprocess
 import json
 from pathlib import Path
@@ -78,6 +79,24 @@ def extract_isbn_from_text(text):
     
     return matches
 
+def _isbns_from_ebook_meta(output):
+    """Extract ISBNs from the text output of ebook-meta"""
+    # Extract ISBN from metadata
+    isbns = extract_isbn_from_text(output)
+    
+    # Also look for identifiers line
+    id_match = re.search(r'Identifiers\s*:\s*(.+)', output)
+    if id_match:
+        id_line = id_match.group(1)
+        # Look for isbn:xxx pattern
+        isbn_in_id = re.search(r'isbn:([^\s,]+)', id_line, re.IGNORECASE)
+        if isbn_in_id:
+            isbn = isbn_in_id.group(1).strip()
+            if validate_isbn(isbn) and isbn not in isbns:
+                isbns.append(isbn)
+    
+    return isbns
+
 def extract_isbn_from_file(file_path):
     """Extract ISBN from ebook metadata using Calibre CLI"""
     file_path = os.path.expanduser(file_path)
@@ -97,23 +116,45 @@ def extract_isbn_from_file(file_path):
     if result.returncode != 0:
         raise Exception(f"Failed to extract metadata: {result.stderr}")
     
-    output = result.stdout
+    return _isbns_from_ebook_meta(result.stdout)
+
+async def extract_isbn_from_file_async(file_path):
+    """Extract ISBN from ebook metadata without blocking the event loop"""
+    file_path = os.path.expanduser(file_path)
     
-    # Extract ISBN from metadata
-    isbns = extract_isbn_from_text(output)
+    if not os.path.isfile(file_path):
+        raise FileNotFoundError(f"File not found: {file_path}")
     
-    # Also look for identifiers line
-    id_match = re.search(r'Identifiers\s*:\s*(.+)', output)
-    if id_match:
-        id_line = id_match.group(1)
-        # Look for isbn:xxx pattern
-        isbn_in_id = re.search(r'isbn:([^\s,]+)', id_line, re.IGNORECASE)
-        if isbn_in_id:
-            isbn = isbn_in_id.group(1).strip()
-            if validate_isbn(isbn) and isbn not in isbns:
-                isbns.append(isbn)
+    proc = await asyncio.create_subprocess_exec(
+        'ebook-meta', file_path,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE
+    )
+    stdout, stderr = await proc.communicate()
     
-    return isbns
+    if proc.returncode != 0:
+        raise Exception(f"Failed to extract metadata: {stderr.decode(errors='replace')}")
+    
+    return _isbns_from_ebook_meta(stdout.decode(errors='replace'))
+
+async def bulk_extract_async(paths, concurrency=None):
+    """Extract ISBNs from many files, running up to `concurrency` ebook-meta processes at once
+
+    Returns a dict mapping each path to its list of ISBNs, or to the
+    exception raised while extracting it.
+    """
+    semaphore = asyncio.Semaphore(concurrency or os.cpu_count() or 1)
+    
+    async def _extract(path):
+        async with semaphore:
+            return await extract_isbn_from_file_async(path)
+    
+    results = await asyncio.gather(*(_extract(p) for p in paths), return_exceptions=True)
+    return dict(zip(paths, results))
+
+def bulk_extract(paths, concurrency=None):
+    """Synchronous wrapper around bulk_extract_async"""
+    return asyncio.run(bulk_extract_async(list(paths), concurrency))
 
 def find_books_by_isbn(isbn, library_path=DEFAULT_CALIBRE_LIBRARY):
     """Find books with a specific ISBN in the library"""
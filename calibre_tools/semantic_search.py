@@ -5,9 +5,13 @@ import json
 import subprocess
 import time
 import re
+import functools
+import threading
 from datetime import datetime, timedelta
 from sentence_transformers import SentenceTransformer
 import numpy as np
+import torch
+from sklearn.decomposition import PCA
 from sklearn.metrics.pairwise import cosine_similarity
 
 from calibre_tools.config import (
@@ -15,11 +19,83 @@ from calibre_tools.config import (
     DEFAULT_EMBEDDING_FILE,
     DEFAULT_METADATA_FILE,
     DEFAULT_MODEL_NAME,
-    DEFAULT_DEVICE,
-    CACHE_EXPIRY_DAYS,
-    FORCE_REFRESH,
+    get_config,
+    get_default_device,
 )
 
+_HTML_TAG_RE = re.compile(r'<[^>]+>')
+
+# Libraries with at least this many books are sharded across GPUs with a multi-process pool
+MULTI_PROCESS_MIN_TEXTS = 5000
+
+# Queries are padded to this many tokens when encoded through a CUDA graph
+CUDA_GRAPH_SEQ_LEN = 128
+
+def quantize(embeddings):
+    """Quantize each row to int8 with a symmetric scale; returns (int8 matrix, float32 scales)"""
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    scales = np.abs(embeddings).max(axis=1) / 127
+    scales[scales == 0] = 1
+    quantized = np.round(embeddings / scales[:, None]).astype(np.int8)
+    return quantized, scales.astype(np.float32)
+
+def _resolve_options(device, pca_dim, quantize_int8):
+    """Fill in device and index options left as None from the current config (pca_dim=0 disables PCA)"""
+    settings = get_config()
+    if device is None:
+        device = get_default_device()
+    if pca_dim is None:
+        pca_dim = settings["embedding_pca_dim"]
+    if quantize_int8 is None:
+        quantize_int8 = settings["embedding_int8"]
+    return device, pca_dim, quantize_int8
+
+class _CudaGraphEncoder:
+    """Encode short queries by replaying a CUDA graph captured on a fixed padded shape"""
+
+    def __init__(self, model, seq_len=CUDA_GRAPH_SEQ_LEN):
+        self.model = model
+        self.seq_len = seq_len
+        # The graph's input and output buffers are shared by every caller
+        self._lock = threading.Lock()
+
+        features = model.tokenize([""])
+        self.static_inputs = {
+            name: torch.zeros((1, seq_len), dtype=tensor.dtype, device=model.device)
+            for name, tensor in features.items()
+            if isinstance(tensor, torch.Tensor)
+        }
+
+        with torch.no_grad():
+            # Warm up on a side stream before capturing, as CUDA graphs require
+            stream = torch.cuda.Stream()
+            stream.wait_stream(torch.cuda.current_stream())
+            with torch.cuda.stream(stream):
+                for _ in range(3):
+                    model(dict(self.static_inputs))
+            torch.cuda.current_stream().wait_stream(stream)
+
+            self.graph = torch.cuda.CUDAGraph()
+            with torch.cuda.graph(self.graph):
+                self.static_output = model(dict(self.static_inputs))["sentence_embedding"]
+
+    def encode(self, query):
+        """Return a (1, dim) embedding, or None if the query is too long for the graph"""
+        features = self.model.tokenize([query])
+        length = features["input_ids"].shape[1]
+        if length > self.seq_len:
+            return None
+
+        with self._lock:
+            for name, static_input in self.static_inputs.items():
+                static_input.zero_()
+                static_input[:, :length].copy_(features[name])
+
+            self.graph.replay()
+            output = self.static_output.detach().clone()
+
+        return output.float().cpu().numpy()
+
 class CalibreSemanticSearch:
     def __init__(
         self, 
@@ -27,13 +103,19 @@ class CalibreSemanticSearch:
         embedding_file=DEFAULT_EMBEDDING_FILE,
         metadata_file=DEFAULT_METADATA_FILE,
         model_name=DEFAULT_MODEL_NAME,
-        device=DEFAULT_DEVICE,
+        device=None,
+        pca_dim=None,
+        quantize_int8=None,
     ):
         self.library_path = os.path.expanduser(library_path)
         self.embedding_file = embedding_file
         self.metadata_file = metadata_file
         self.model_name = model_name
-        self.device = device
+        self.device, self.pca_dim, self.quantize_int8 = _resolve_options(device, pca_dim, quantize_int8)
+        self._graph_encoder = None
+        self._index = None
+        self._pca = None
+        self._scales = None
         
         # Load or create data
         self.load_or_create_data()
@@ -42,6 +124,7 @@ class CalibreSemanticSearch:
         """Load existing data or create new embeddings if needed"""
         # Model will be loaded lazily when needed
         self.model = None
+        self._index = None
 
         # Check if we need to refresh the data
         refresh_needed = self._check_refresh_needed()
@@ -76,7 +159,8 @@ class CalibreSemanticSearch:
     
     def _check_refresh_needed(self):
         """Check if we need to refresh the cache"""
-        if FORCE_REFRESH:
+        settings = get_config()
+        if settings["force_refresh"]:
             return True
         
         # Check if files exist
@@ -85,7 +169,7 @@ class CalibreSemanticSearch:
         
         # Check if files are older than cache expiry
         metadata_time = datetime.fromtimestamp(os.path.getmtime(self.metadata_file))
-        if datetime.now() - metadata_time > timedelta(days=CACHE_EXPIRY_DAYS):
+        if datetime.now() - metadata_time > timedelta(days=settings["cache_expiry_days"]):
             return True
         
         return False
@@ -125,45 +209,77 @@ class CalibreSemanticSearch:
     
     def _create_searchable_text(self, book):
         """Combine relevant metadata fields into searchable text"""
+        # Bind each field once instead of probing the dict repeatedly
+        get = book.get
+        title = get('title')
+        authors = get('authors')
+        series = get('series')
+        tags = get('tags')
+        publisher = get('publisher')
+        comments = get('comments')
+
         parts = []
         
         # Title (include twice for emphasis)
-        if book.get('title'):
-            parts.append(f"Title: {book['title']}")
-            parts.append(book['title'])
+        if title:
+            parts += (f"Title: {title}", title)
         
         # Authors
-        if book.get('authors'):
-            authors = ', '.join(book['authors']) if isinstance(book['authors'], list) else book['authors']
-            parts.append(f"Authors: {authors}")
+        if authors:
+            parts.append(f"Authors: {', '.join(authors) if isinstance(authors, list) else authors}")
         
         # Series
-        if book.get('series'):
-            parts.append(f"Series: {book['series']}")
+        if series:
+            parts.append(f"Series: {series}")
         
         # Tags/Genres
-        if book.get('tags'):
-            tags = ', '.join(book['tags']) if isinstance(book['tags'], list) else book['tags']
-            parts.append(f"Tags: {tags}")
+        if tags:
+            parts.append(f"Tags: {', '.join(tags) if isinstance(tags, list) else tags}")
         
         # Publisher
-        if book.get('publisher'):
-            parts.append(f"Publisher: {book['publisher']}")
+        if publisher:
+            parts.append(f"Publisher: {publisher}")
         
-        # Description/Comments
-        if book.get('comments'):
-            # Strip HTML tags
-            clean_comments = re.sub(r'<[^>]+>', '', book['comments'])
-            parts.append(f"Description: {clean_comments}")
-            parts.append(clean_comments)  # Include twice for emphasis
+        # Description/Comments (strip HTML tags, include twice for emphasis)
+        if comments:
+            clean_comments = _HTML_TAG_RE.sub('', comments)
+            parts += (f"Description: {clean_comments}", clean_comments)
         
         return " | ".join(parts)
     
+    @classmethod
+    @functools.lru_cache(maxsize=None)
+    def _get_model(cls, model_name, device):
+        """Load a model once per (model_name, device) and share it between instances"""
+        print(f"Loading embedding model {model_name} on {device}...")
+        return SentenceTransformer(model_name, device=device)
+
     def _load_model(self):
         """Lazy load the model only when needed"""
         if self.model is None:
-            print(f"Loading embedding model {self.model_name} on {self.device}...")
-            self.model = SentenceTransformer(self.model_name, device=self.device)
+            self.model = self._get_model(self.model_name, self.device)
+
+    def _get_graph_encoder(self):
+        """Lazily capture a CUDA graph for query encoding; None when not on CUDA or capture fails"""
+        if self._graph_encoder is None and str(self.device).startswith("cuda"):
+            try:
+                self._graph_encoder = _CudaGraphEncoder(self.model)
+            except Exception as e:
+                print(f"Warning: CUDA graph capture failed ({e}), using eager encoding")
+                self._graph_encoder = False
+        return self._graph_encoder or None
+
+    def _multi_process_devices(self):
+        """Devices to shard embedding generation across, or None to encode in-process
+
+        Only several GPUs are worth a pool. On CPU, in-process encode already
+        uses every core through torch's intra-op threads, while a pool would
+        load one model copy and one thread pool per worker.
+        """
+        device = str(self.device)
+        if device.startswith("cuda") and torch.cuda.device_count() > 1:
+            return [f"cuda:{i}" for i in range(torch.cuda.device_count())]
+        return None
 
     def _create_embeddings(self):
         """Create embeddings for all books"""
@@ -174,13 +290,21 @@ class CalibreSemanticSearch:
         book_ids = list(self.searchable_texts.keys())
         texts_to_embed = list(self.searchable_texts.values())
 
-        # Generate embeddings
-        embeddings = self.model.encode(
-            texts_to_embed,
-            batch_size=32,
-            show_progress_bar=True,
-            convert_to_numpy=True
-        )
+        # Generate embeddings, sharding large libraries across GPUs
+        target_devices = self._multi_process_devices() if len(texts_to_embed) >= MULTI_PROCESS_MIN_TEXTS else None
+        if target_devices:
+            pool = self.model.start_multi_process_pool(target_devices=target_devices)
+            try:
+                embeddings = self.model.encode_multi_process(texts_to_embed, pool, batch_size=64)
+            finally:
+                self.model.stop_multi_process_pool(pool)
+        else:
+            embeddings = self.model.encode(
+                texts_to_embed,
+                batch_size=32,
+                show_progress_bar=True,
+                convert_to_numpy=True
+            )
 
         # Map book IDs to embeddings
         embeddings_dict = {book_id: emb for book_id, emb in zip(book_ids, embeddings)}
@@ -191,20 +315,57 @@ class CalibreSemanticSearch:
 
         return embeddings_dict
     
+    def _get_index(self):
+        """Stack the book embeddings into a matrix once, reduced with PCA and quantized if enabled"""
+        if self._index is None:
+            book_ids = list(self.embeddings_dict.keys())
+            matrix = np.vstack([self.embeddings_dict[book_id] for book_id in book_ids])
+
+            self._pca = None
+            if self.pca_dim and self.pca_dim < matrix.shape[1]:
+                self._pca = PCA(n_components=min(self.pca_dim, *matrix.shape))
+                matrix = self._pca.fit_transform(matrix)
+
+            # Normalize before quantizing so a dot product with a unit query is the cosine
+            self._scales = None
+            if self.quantize_int8:
+                norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+                norms[norms == 0] = 1
+                matrix, self._scales = quantize(matrix / norms)
+
+            self._index = (book_ids, matrix)
+        return self._index
+
     def search(self, query, top_n=10):
         """Perform semantic search on book metadata"""
         # Load model if not already loaded
         self._load_model()
 
-        # Embed the query
-        query_embedding = self.model.encode(query, convert_to_numpy=True).reshape(1, -1)
+        # Embed the query, replaying the captured CUDA graph when the query fits
+        query_embedding = None
+        graph_encoder = self._get_graph_encoder()
+        if graph_encoder is not None:
+            query_embedding = graph_encoder.encode(query)
+        if query_embedding is None:
+            query_embedding = self.model.encode(query, convert_to_numpy=True).reshape(1, -1)
 
         # Calculate similarities efficiently (vectorized)
-        book_ids = list(self.embeddings_dict.keys())
-        all_embeddings = np.vstack([self.embeddings_dict[book_id] for book_id in book_ids])
+        book_ids, all_embeddings = self._get_index()
+        if self._pca is not None:
+            query_embedding = self._pca.transform(query_embedding)
 
         # Compute all similarities at once (much faster)
-        similarities = cosine_similarity(query_embedding, all_embeddings)[0]
+        if self._scales is not None:
+            # Quantize the unit query too and take exact integer dot products;
+            # einsum accumulates in int32 through a small buffer rather than
+            # upcasting the whole index to float
+            query_vector = query_embedding[0].astype(np.float32)
+            query_vector /= np.linalg.norm(query_vector) or 1
+            query_q, query_scale = quantize(query_vector[None, :])
+            dots = np.einsum('ij,j->i', all_embeddings, query_q[0].astype(np.int32))
+            similarities = dots.astype(np.float32) * (self._scales * query_scale[0])
+        else:
+            similarities = cosine_similarity(query_embedding, all_embeddings)[0]
 
         # Get indices of top N results
         top_indices = np.argsort(similarities)[::-1][:top_n]
@@ -220,14 +381,33 @@ class CalibreSemanticSearch:
 
         return results
 
-# Singleton instance for easy access
-_instance = None
+@functools.lru_cache(maxsize=4)
+def _cached_search_instance(library_path, embedding_file, metadata_file, model_name, device, pca_dim,
+                            quantize_int8):
+    return CalibreSemanticSearch(
+        library_path=library_path,
+        embedding_file=embedding_file,
+        metadata_file=metadata_file,
+        model_name=model_name,
+        device=device,
+        pca_dim=pca_dim,
+        quantize_int8=quantize_int8,
+    )
 
-def get_search_instance(**kwargs):
-    global _instance
-    if _instance is None:
-        _instance = CalibreSemanticSearch(**kwargs)
-    return _instance
+def get_search_instance(
+    library_path=DEFAULT_CALIBRE_LIBRARY,
+    embedding_file=DEFAULT_EMBEDDING_FILE,
+    metadata_file=DEFAULT_METADATA_FILE,
+    model_name=DEFAULT_MODEL_NAME,
+    device=None,
+    pca_dim=None,
+    quantize_int8=None,
+):
+    """Get a shared search instance, one per combination of library, cache files, model and index options"""
+    return _cached_search_instance(
+        os.path.expanduser(library_path), embedding_file, metadata_file, model_name,
+        *_resolve_options(device, pca_dim, quantize_int8)
+    )
 
 def search(query, top_n=10, **kwargs):
     """Convenience function for searching"""
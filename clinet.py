@@ -2,15 +2,25 @@ import asyncio
 from fastmcp import Client
 
 
+async def call_tool_batch(client, name, batch):
+    """Call one tool with each set of arguments in batch concurrently"""
+    return await asyncio.gather(*(client.call_tool(name, args) for args in batch))
+
+
 async def test():
     async with Client("http://127.0.0.1:8000") as client:
         # List available tools
         tools = await client.list_tools()
         print("Available tools:", tools)
 
-        # Call get_current_time
-        result = await client.call_tool("get_current_time", {"timezone": "UTC"})
-        print("Result:", result)
+        # Call get_current_time for several timezones at once
+        results = await call_tool_batch(
+            client,
+            "get_current_time",
+            [{"timezone": tz} for tz in ("UTC", "Europe/Zurich", "America/New_York")]
+        )
+        for result in results:
+            print("Result:", result)
 
 
-asyncio.run(test())
\ No newline at end of file
+asyncio.run(test())
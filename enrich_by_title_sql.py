@@ -13,12 +13,17 @@ Usage:
 """
 
 import argparse
-import sqlite3
-import subprocess
+import functools
+import itertools
 import re
-from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 from calibre_tools.config import DEFAULT_CALIBRE_LIBRARY
-from calibre_tools.cli_wrapper import fetch_ebook_metadata, set_metadata
+from calibre_tools.calibre_api import (
+    apply_pending_updates,
+    get_conn,
+    open_calibre_library
+)
+from calibre_tools.cli_wrapper import MAX_CONCURRENT_FETCHES, cached_fetch_metadata
 
 
 # Bad author names to skip (only really problematic ones)
@@ -37,7 +42,29 @@ BAD_TITLE_PATTERNS = [
     r'^B[A-Z0-9]{9}$',  # ASIN as title
 ]
 
-
+# Fetched metadata keys and the Calibre fields they update
+FIELD_MAP = (
+    ('Title', 'title'),
+    ('Author(s)', 'authors'),
+    ('Publisher', 'publisher'),
+    ('Comments', 'comments'),
+    ('Tags', 'tags'),
+    ('Published', 'pubdate'),
+    ('Series', 'series'),
+    ('Rating', 'rating'),
+)
+
+# Fields shown but not updated, since a title search may match another edition
+TITLE_SEARCH_SKIPPED_FIELDS = frozenset({'title', 'authors'})
+
+# All title patterns as one regex, so each title is scanned only once
+_BAD_TITLE_RE = re.compile(
+    '|'.join(f'(?:{pattern})' for pattern in BAD_TITLE_PATTERNS), re.IGNORECASE
+)
+_BAD_AUTHORS_LOWER = tuple(author.lower() for author in BAD_AUTHORS)
+
+
+@functools.lru_cache(maxsize=None)
 def parse_author_sort(author_sort):
     """
     Parse author_sort format (Last, First & Last2, First2) to normal format.
@@ -76,14 +103,7 @@ def parse_author_sort(author_sort):
 
 def is_bad_title(title):
     """Check if title looks like a non-book or bad filename."""
-    if not title:
-        return True
-
-    for pattern in BAD_TITLE_PATTERNS:
-        if re.search(pattern, title, re.IGNORECASE):
-            return True
-
-    return False
+    return not title or bool(_BAD_TITLE_RE.search(title))
 
 
 def is_bad_author(author_sort):
@@ -91,34 +111,31 @@ def is_bad_author(author_sort):
     if not author_sort:
         return True
 
-    for bad_author in BAD_AUTHORS:
-        if bad_author.lower() in author_sort.lower():
-            return True
+    lowered = author_sort.lower()
+    return any(bad_author in lowered for bad_author in _BAD_AUTHORS_LOWER)
 
-    return False
 
-
-def find_books_for_title_enrichment(limit=10, min_title_length=10,
-                                     library_path=DEFAULT_CALIBRE_LIBRARY):
+def iter_books_for_title_enrichment(min_title_length=10,
+                                    library_path=DEFAULT_CALIBRE_LIBRARY):
     """
-    Find books without ISBNs or descriptions but with good title/author info.
+    Yield books without ISBNs or descriptions but with good title/author info.
+
+    Rows are read from the cursor as they are consumed, most recently
+    modified first, so callers can stop as soon as they have enough.
 
     Args:
-        limit: Maximum number of books to return
         min_title_length: Minimum title length to consider
         library_path: Path to Calibre library
 
-    Returns:
-        List of book dicts with id, title, authors
+    Yields:
+        Book dicts with id, title, author_sort, author_normal
     """
-    db_path = Path(library_path) / 'metadata.db'
-
-    if not db_path.exists():
-        raise Exception(f"Database not found at: {db_path}")
+    conn = get_conn(library_path)
 
-    # Build bad authors clause
-    bad_authors_clause = " AND ".join([f"b.author_sort NOT LIKE '%{author}%'"
-                                       for author in BAD_AUTHORS])
+    # Build bad authors clause; the patterns are bound as parameters so the
+    # statement text stays the same across calls
+    bad_authors_clause = " AND ".join(["b.author_sort NOT LIKE ?"] * len(BAD_AUTHORS))
+    bad_author_patterns = [f"%{author}%" for author in BAD_AUTHORS]
 
     query = f"""
         SELECT
@@ -126,93 +143,112 @@ def find_books_for_title_enrichment(limit=10, min_title_length=10,
             b.title,
             b.author_sort as authors
         FROM books b
-        LEFT JOIN comments c ON b.id = c.book
-        LEFT JOIN identifiers i ON b.id = i.book AND i.type = 'isbn'
         WHERE
-            -- No description
-            (c.text IS NULL OR c.text = '')
-            -- No ISBN
-            AND i.val IS NULL
+            -- No description (which also rules out magazines, as those are
+            -- marked in their description)
+            NOT EXISTS (SELECT 1 FROM comments c WHERE c.book = b.id AND c.text <> '')
+            -- No ISBN (both probes use Calibre's UNIQUE(book, ...) indexes on
+            -- identifiers and comments, so no extra index is needed)
+            AND NOT EXISTS (SELECT 1 FROM identifiers i WHERE i.book = b.id AND i.type = 'isbn')
             -- Title not too short
             AND LENGTH(b.title) > ?
-            -- Not magazines
-            AND (c.text IS NULL OR c.text NOT LIKE '%periodical/magazine issue%')
-            -- Exclude bad authors
+            -- Exclude the common BAD_TITLE_PATTERNS here so LIMIT counts
+            -- usable rows (is_bad_title still checks all of them)
+            AND b.title NOT LIKE '%PowerPoint%'
+            AND b.title NOT LIKE '%.indd'
+            AND b.title NOT LIKE 'Untitled%'
+            AND NOT (b.title LIKE 'Chapter %' AND substr(b.title, 9) <> ''
+                     AND substr(b.title, 9) NOT GLOB '*[^0-9]*')
+            AND NOT (b.title GLOB '[0-9][0-9][0-9][0-9][0-9][0-9][0-9][0-9][0-9][0-9][0-9][0-9][0-9]*'
+                     AND b.title NOT GLOB '*[^0-9]*')
+            -- Exclude missing and bad authors
+            AND b.author_sort <> ''
             AND {bad_authors_clause}
         ORDER BY b.last_modified DESC
-        LIMIT ?
     """
 
-    # Execute query in read-only mode
-    db_uri = f"file:{db_path}?mode=ro"
-    conn = sqlite3.connect(db_uri, uri=True)
-    conn.row_factory = sqlite3.Row
+    cursor = conn.execute(query, (min_title_length, *bad_author_patterns))
 
-    try:
-        cursor = conn.cursor()
-        cursor.execute(query, (min_title_length, limit))
-        rows = cursor.fetchall()
-
-        # Filter out bad titles and authors
-        candidates = []
-        for row in rows:
-            title = row['title']
-            author_sort = row['authors']
-
-            # Skip bad titles
-            if is_bad_title(title):
-                continue
+    # Backstop for the patterns the query does not cover
+    for book_id, title, author_sort in cursor:
+        # Skip bad titles
+        if is_bad_title(title):
+            continue
 
-            # Skip bad authors
-            if is_bad_author(author_sort):
-                continue
+        # Skip bad authors
+        if is_bad_author(author_sort):
+            continue
 
-            # Parse author to normal format
-            author_normal = parse_author_sort(author_sort)
+        # Parse author to normal format
+        author_normal = parse_author_sort(author_sort)
 
-            candidates.append({
-                'id': row['id'],
-                'title': title,
-                'author_sort': author_sort,
-                'author_normal': author_normal
-            })
+        yield {
+            'id': book_id,
+            'title': title,
+            'author_sort': author_sort,
+            'author_normal': author_normal
+        }
 
-        return candidates
 
-    finally:
-        conn.close()
+def find_books_for_title_enrichment(limit=10, min_title_length=10,
+                                     library_path=DEFAULT_CALIBRE_LIBRARY):
+    """
+    Find books without ISBNs or descriptions but with good title/author info.
 
+    Args:
+        limit: Maximum number of books to return
+        min_title_length: Minimum title length to consider
+        library_path: Path to Calibre library
 
-def add_isbn_to_book(book_id, isbn, library_path=DEFAULT_CALIBRE_LIBRARY):
+    Returns:
+        List of book dicts with id, title, authors
     """
-    Add ISBN to a book's identifiers.
+    books = iter_books_for_title_enrichment(min_title_length, library_path)
+    return list(itertools.islice(books, limit))
+
+
+def fetch_metadata_for_book(book):
+    """
+    Fetch online metadata for a book by title and author.
+
+    Tries title+author first and falls back to title only. Nothing is
+    printed so this can run in a worker thread; progress messages are
+    returned for the caller to show alongside the book.
 
     Args:
-        book_id: Calibre book ID
-        isbn: ISBN to add
-        library_path: Path to Calibre library
+        book: Candidate dict from find_books_for_title_enrichment
 
     Returns:
-        True if successful, False otherwise
+        Tuple of (metadata dict or None, list of progress messages)
     """
-    try:
-        cmd = [
-            'calibredb', 'set_metadata',
-            '--library-path', library_path,
-            '--field', f'identifiers:isbn:{isbn}',
-            str(book_id)
-        ]
+    title = book['title']
+    author_normal = book['author_normal']
+    messages = []
+    metadata = None
 
-        result = subprocess.run(cmd, capture_output=True, text=True)
+    # Check if author looks legitimate (not empty, not just garbage)
+    has_good_author = author_normal and len(author_normal.strip()) > 2
 
-        if result.returncode != 0:
-            raise Exception(f"Failed to add ISBN: {result.stderr}")
+    if has_good_author:
+        messages.append(f"Fetching metadata for '{title}' by '{author_normal}'...")
+        try:
+            metadata = cached_fetch_metadata(title=title, authors=author_normal)
+        except Exception as e:
+            messages.append(f"  ⚠ Title+author search failed: {e}")
 
-        return True
+    # Fall back to title-only if author search failed or no author
+    if not metadata:
+        if has_good_author:
+            messages.append(f"  → Retrying with title only...")
+        else:
+            messages.append(f"Fetching metadata for '{title}' (title only, no author)...")
 
-    except Exception as e:
-        print(f"    ✗ Error adding ISBN: {e}")
-        return False
+        try:
+            metadata = cached_fetch_metadata(title=title)
+        except Exception as e:
+            messages.append(f"✗ Title-only search also failed: {e}")
+
+    return metadata, messages
 
 
 def main():
@@ -302,48 +338,26 @@ def main():
     successful = 0
     failed = 0
     no_metadata = 0
+    pending = []
 
-    for i, book in enumerate(candidates, 1):
-        book_id = book['id']
-        title = book['title']
-        author_normal = book['author_normal']
+    # Open the library once for all updates (None means use calibredb)
+    library = open_calibre_library(args.library_path)
 
-        print(f"\n[{i}/{len(candidates)}] Enriching book {book_id}: {title}")
-        print(f"Author: {author_normal}")
-        print("-" * 80)
+    # Fetch metadata for all candidates concurrently (network-bound), review
+    # each book's updates in turn, then write all accepted updates at the end
+    print(f"\nFetching metadata for {len(candidates)} book(s)...")
+    with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_FETCHES) as executor:
+        fetched = list(executor.map(fetch_metadata_for_book, candidates))
 
-        # Fetch metadata by title/author
-        # Try with author first, then fall back to title-only if no results
-        metadata = None
-
-        # Check if author looks legitimate (not empty, not just garbage)
-        has_good_author = author_normal and len(author_normal.strip()) > 2
+    for i, (book, (metadata, messages)) in enumerate(zip(candidates, fetched), 1):
+        book_id = book['id']
 
-        if has_good_author:
-            print(f"Fetching metadata for '{title}' by '{author_normal}'...")
-            try:
-                metadata = fetch_ebook_metadata(
-                    title=title,
-                    authors=author_normal,
-                    timeout=30
-                )
-            except Exception as e:
-                print(f"  ⚠ Title+author search failed: {e}")
-
-        # Fall back to title-only if author search failed or no author
-        if not metadata:
-            if has_good_author:
-                print(f"  → Retrying with title only...")
-            else:
-                print(f"Fetching metadata for '{title}' (title only, no author)...")
+        print(f"\n[{i}/{len(candidates)}] Enriching book {book_id}: {book['title']}")
+        print(f"Author: {book['author_normal']}")
+        print("-" * 80)
 
-            try:
-                metadata = fetch_ebook_metadata(
-                    title=title,
-                    timeout=30
-                )
-            except Exception as e:
-                print(f"✗ Title-only search also failed: {e}")
+        for message in messages:
+            print(message)
 
         try:
             if not metadata:
@@ -355,25 +369,14 @@ def main():
 
             # Determine what to update
             updates = {}
-            field_map = {
-                'Title': 'title',
-                'Author(s)': 'authors',
-                'Publisher': 'publisher',
-                'Comments': 'comments',
-                'Tags': 'tags',
-                'Published': 'pubdate',
-                'Series': 'series',
-                'Rating': 'rating'
-            }
 
             # Track if we found an ISBN
             found_isbn = None
 
             print("\nAvailable updates:")
-            for meta_key, db_field in field_map.items():
-                if meta_key in metadata and metadata[meta_key]:
-                    value = metadata[meta_key]
-
+            for meta_key, db_field in FIELD_MAP:
+                value = metadata.get(meta_key)
+                if value:
                     # Show preview for comments
                     if meta_key == 'Comments':
                         preview = value[:100] + "..." if len(value) > 100 else value
@@ -383,7 +386,7 @@ def main():
 
                     # Only update if we're confident it's the same book
                     # (for title-based search, we skip updating title/author)
-                    if db_field not in ['title', 'authors']:
+                    if db_field not in TITLE_SEARCH_SKIPPED_FIELDS:
                         updates[db_field] = value
 
             # Check for ISBN in metadata
@@ -396,7 +399,7 @@ def main():
                 no_metadata += 1
                 continue
 
-            # Apply updates
+            # Queue updates; they are all written after the review
             if args.auto_apply:
                 apply = True
             else:
@@ -405,23 +408,7 @@ def main():
                 apply = response.lower() != 'n'
 
             if apply:
-                try:
-                    # Add ISBN first if found
-                    if found_isbn:
-                        print(f"Adding ISBN {found_isbn}...")
-                        if add_isbn_to_book(book_id, found_isbn, args.library_path):
-                            print(f"  ✓ ISBN added")
-
-                    # Apply other updates
-                    if updates:
-                        set_metadata(book_id, library_path=args.library_path, **updates)
-                        print(f"✓ Applied {len(updates)} update(s) to book {book_id}")
-
-                    successful += 1
-
-                except Exception as e:
-                    print(f"✗ Failed to apply updates: {e}")
-                    failed += 1
+                pending.append((book_id, found_isbn, updates))
             else:
                 print("Skipped")
 
@@ -430,6 +417,26 @@ def main():
             failed += 1
             continue
 
+    if pending:
+        print("\n" + "=" * 80)
+        print(f"APPLYING UPDATES TO {len(pending)} BOOK(S)")
+        print("=" * 80)
+
+        results = apply_pending_updates(pending, args.library_path, library)
+        for (book_id, found_isbn, updates), applied in zip(pending, results):
+            if applied:
+                if found_isbn:
+                    print(f"  ✓ ISBN {found_isbn} added to book {book_id}")
+                if updates:
+                    print(f"✓ Applied {len(updates)} update(s) to book {book_id}")
+                successful += 1
+            else:
+                print(f"✗ Failed to apply updates to book {book_id}")
+                failed += 1
+
+    if library is not None:
+        library.close()
+
     # Summary
     print("\n" + "=" * 80)
     print("SUMMARY")
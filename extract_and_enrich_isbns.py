@@ -14,13 +14,27 @@ Usage:
 """
 
 import argparse
-import sqlite3
 import os
-import subprocess
-from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 from calibre_tools.config import DEFAULT_CALIBRE_LIBRARY
-from calibre_tools.isbn_tools import extract_isbn_from_file
-from calibre_tools.cli_wrapper import fetch_ebook_metadata, set_metadata
+from calibre_tools.isbn_tools import bulk_extract
+from calibre_tools.calibre_api import (
+    apply_pending_updates,
+    get_conn,
+    open_calibre_library
+)
+from calibre_tools.cli_wrapper import MAX_CONCURRENT_FETCHES, cached_fetch_metadata
+
+# Fetched metadata keys and the Calibre fields they update
+FIELD_MAP = (
+    ('Title', 'title'),
+    ('Author(s)', 'authors'),
+    ('Publisher', 'publisher'),
+    ('Comments', 'comments'),
+    ('Tags', 'tags'),
+    ('Published', 'pubdate'),
+    ('Series', 'series'),
+)
 
 
 def find_books_without_isbn(limit=10, missing_description=False,
@@ -38,10 +52,7 @@ def find_books_without_isbn(limit=10, missing_description=False,
     Returns:
         List of dicts with book info (id, title, authors, file_path, format)
     """
-    db_path = Path(library_path) / 'metadata.db'
-
-    if not db_path.exists():
-        raise Exception(f"Database not found at: {db_path}")
+    conn = get_conn(library_path)
 
     # Build format clause
     format_placeholders = ','.join('?' * len(formats))
@@ -49,7 +60,7 @@ def find_books_without_isbn(limit=10, missing_description=False,
 
     # Build missing description clause
     if missing_description:
-        description_clause = "AND (c.text IS NULL OR c.text = '')"
+        description_clause = "AND NOT EXISTS (SELECT 1 FROM comments c WHERE c.book = b.id AND c.text <> '')"
     else:
         description_clause = ""
 
@@ -62,82 +73,134 @@ def find_books_without_isbn(limit=10, missing_description=False,
             b.path,
             d.name as filename,
             d.format,
-            CASE WHEN c.text IS NULL OR c.text = '' THEN 1 ELSE 0 END as missing_description
+            NOT EXISTS (SELECT 1 FROM comments c WHERE c.book = b.id AND c.text <> '') as missing_description
         FROM books b
         JOIN data d ON b.id = d.book
-        LEFT JOIN identifiers i ON b.id = i.book AND i.type = 'isbn'
-        LEFT JOIN comments c ON b.id = c.book
         WHERE
-            i.val IS NULL
+            -- No ISBN; a probe on Calibre's UNIQUE(book, type) index
+            NOT EXISTS (SELECT 1 FROM identifiers i WHERE i.book = b.id AND i.type = 'isbn')
             AND {format_clause}
             {description_clause}
             -- Exclude magazines/periodicals
-            AND (c.text IS NULL OR c.text NOT LIKE '%periodical/magazine issue%')
+            AND NOT EXISTS (
+                SELECT 1 FROM comments c
+                WHERE c.book = b.id AND c.text LIKE '%periodical/magazine issue%'
+            )
         ORDER BY b.last_modified DESC
         LIMIT ?
     """
 
-    # Execute query in read-only mode
-    db_uri = f"file:{db_path}?mode=ro"
-    conn = sqlite3.connect(db_uri, uri=True)
-    conn.row_factory = sqlite3.Row
+    cursor = conn.execute(query, (*formats, limit))
 
-    try:
-        cursor = conn.cursor()
-        cursor.execute(query, (*formats, limit))
-        rows = cursor.fetchall()
-
-        # Convert to list of dicts
-        candidates = []
-        for row in rows:
-            # Build full file path
-            file_path = Path(library_path) / row['path'] / f"{row['filename']}.{row['format'].lower()}"
-
-            candidates.append({
-                'id': row['id'],
-                'title': row['title'],
-                'authors': row['authors'] or 'Unknown',
-                'format': row['format'],
-                'file_path': str(file_path),
-                'missing_description': bool(row['missing_description'])
-            })
+    # Rows only carry the requested formats, so extensions can be looked up
+    library_root = str(library_path)
+    extensions = {fmt: fmt.lower() for fmt in formats}
 
-        return candidates
+    # Convert rows to dicts as they are read from the cursor
+    candidates = []
+    for book_id, title, authors, path, filename, fmt, missing_description in cursor:
+        # Build full file path
+        file_path = os.path.join(library_root, path, f"{filename}.{extensions[fmt]}")
 
-    finally:
-        conn.close()
+        candidates.append({
+            'id': book_id,
+            'title': title,
+            'authors': authors or 'Unknown',
+            'format': fmt,
+            'file_path': file_path,
+            'missing_description': bool(missing_description)
+        })
 
+    return candidates
 
-def add_isbn_to_book(book_id, isbn, library_path=DEFAULT_CALIBRE_LIBRARY):
+
+def fetch_for_book(book, extraction, find_only=False):
     """
-    Add ISBN to a book's identifiers.
+    Pick a book's ISBN from its extraction result and fetch online metadata for it.
+
+    Nothing is printed so this can run in a worker thread; progress messages
+    are returned for the caller to show alongside the book.
 
     Args:
-        book_id: Calibre book ID
-        isbn: ISBN to add
-        library_path: Path to Calibre library
+        book: Candidate dict from find_books_without_isbn
+        extraction: bulk_extract result for the book's file (list of ISBNs or
+                    the exception raised)
+        find_only: Only extract the ISBN, do not fetch metadata
 
     Returns:
-        True if successful, False otherwise
+        Tuple of (ISBN or None, metadata dict or None, list of progress messages)
     """
-    try:
-        cmd = [
-            'calibredb', 'set_metadata',
-            '--library-path', library_path,
-            '--field', f'identifiers:isbn:{isbn}',
-            str(book_id)
-        ]
+    messages = [f"Extracting ISBN from {book['format']} file..."]
 
-        result = subprocess.run(cmd, capture_output=True, text=True)
+    if isinstance(extraction, Exception):
+        messages.append(f"✗ Error extracting ISBN: {extraction}")
+        return None, None, messages
 
-        if result.returncode != 0:
-            raise Exception(f"Failed to add ISBN: {result.stderr}")
+    isbns = extraction
+    if not isbns:
+        messages.append("✗ No ISBN found in file")
+        return None, None, messages
 
-        return True
+    isbn = isbns[0]  # Use first ISBN found
+    messages.append(f"✓ Found ISBN: {isbn}")
 
+    if find_only:
+        return isbn, None, messages
+
+    messages.append(f"\nFetching metadata for ISBN {isbn}...")
+    try:
+        metadata = cached_fetch_metadata(isbn=isbn)
     except Exception as e:
-        print(f"    ✗ Error adding ISBN: {e}")
-        return False
+        messages.append(f"✗ Error fetching metadata: {e}")
+        return isbn, None, messages
+
+    if not metadata:
+        messages.append("✗ No metadata found")
+
+    return isbn, metadata, messages
+
+
+def select_isbn_updates(metadata, auto_apply=False):
+    """
+    Show fetched metadata and return the updates to apply.
+
+    Args:
+        metadata: Metadata dict from fetch_ebook_metadata
+        auto_apply: Accept all updates without prompting
+
+    Returns:
+        Dict of field name -> value (empty if nothing found or declined)
+    """
+    print("✓ Fetched metadata:")
+
+    # Determine what to update
+    updates = {}
+
+    print("\nAvailable updates:")
+    for meta_key, db_field in FIELD_MAP:
+        value = metadata.get(meta_key)
+        if value:
+            # Show preview for comments
+            if meta_key == 'Comments':
+                preview = value[:100] + "..." if len(value) > 100 else value
+                print(f"  • {meta_key}: {preview}")
+            else:
+                print(f"  • {meta_key}: {value}")
+
+            updates[db_field] = value
+
+    if not updates:
+        print("  (No new metadata available)")
+        return {}
+
+    # Confirm updates
+    if not auto_apply:
+        response = input(f"\nApply {len(updates)} update(s)? [Y/n]: ")
+        if response.lower() == 'n':
+            print("Skipped metadata updates")
+            return {}
+
+    return updates
 
 
 def main():
@@ -207,6 +270,16 @@ def main():
         print(f"✗ Error querying database: {e}")
         return
 
+    # Drop rows whose file is missing before listing them; the stat calls
+    # overlap, which helps on slow or network filesystems
+    with ThreadPoolExecutor() as executor:
+        exists = list(executor.map(os.path.exists, [book['file_path'] for book in candidates]))
+
+    missing_count = exists.count(False)
+    if missing_count:
+        print(f"⚠ Skipping {missing_count} book(s) whose file is missing")
+        candidates = [book for book, found in zip(candidates, exists) if found]
+
     if not candidates:
         print("✓ No books found without ISBNs!")
         return
@@ -233,120 +306,78 @@ def main():
     print("EXTRACTING ISBNs")
     print("=" * 60)
 
+    # Open the library once for all updates (None means use calibredb)
+    library = open_calibre_library(args.library_path)
+
     extracted_count = 0
     enriched_count = 0
     failed_count = 0
     extraction_results = []
-
-    for i, book in enumerate(candidates, 1):
+    pending = []
+    titles = {book['id']: book['title'] for book in candidates}
+
+    # Extract ISBNs with one ebook-meta process per CPU running at once, then
+    # fetch metadata concurrently; each book's updates are then reviewed in
+    # turn and all accepted updates written at the end
+    extractions = bulk_extract([book['file_path'] for book in candidates])
+
+    with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_FETCHES) as executor:
+        fetched = list(executor.map(
+            lambda book: fetch_for_book(
+                book, extractions[book['file_path']], args.find_only
+            ),
+            candidates
+        ))
+
+    for i, (book, (isbn, metadata, messages)) in enumerate(zip(candidates, fetched), 1):
         book_id = book['id']
 
         print(f"\n[{i}/{len(candidates)}] Processing book {book_id}: {book['title']}")
         print("-" * 60)
 
-        # Check if file exists
-        if not Path(book['file_path']).exists():
-            print(f"✗ File not found: {book['file_path']}")
+        for message in messages:
+            print(message)
+
+        if not isbn:
             failed_count += 1
             continue
 
-        # Extract ISBN from file
-        print(f"Extracting ISBN from {book['format']} file...")
-        try:
-            isbns = extract_isbn_from_file(book['file_path'])
-
-            if not isbns:
-                print("✗ No ISBN found in file")
-                failed_count += 1
-                continue
-
-            isbn = isbns[0]  # Use first ISBN found
-            print(f"✓ Found ISBN: {isbn}")
-
-            # Add ISBN to book
-            print(f"Adding ISBN to book {book_id}...")
-            if add_isbn_to_book(book_id, isbn, args.library_path):
-                print(f"✓ ISBN added successfully")
-                extracted_count += 1
-
-                extraction_results.append({
-                    'book_id': book_id,
-                    'title': book['title'],
-                    'isbn': isbn,
-                    'extracted': True
-                })
-            else:
-                print(f"✗ Failed to add ISBN")
-                failed_count += 1
-                continue
-
-        except Exception as e:
-            print(f"✗ Error extracting ISBN: {e}")
+        # Step 3: Collect metadata updates (if not find-only mode)
+        updates = {}
+        if metadata:
+            updates = select_isbn_updates(metadata, args.auto_apply)
+
+        # Queue the ISBN and any metadata updates; they are written together
+        # once every book has been reviewed
+        pending.append((book_id, isbn, updates))
+
+    if pending:
+        print("\n" + "=" * 60)
+        print(f"UPDATING {len(pending)} BOOK(S)")
+        print("=" * 60)
+
+    results = apply_pending_updates(pending, args.library_path, library)
+    for (book_id, isbn, updates), applied in zip(pending, results):
+        if applied:
+            print(f"✓ ISBN {isbn} added to book {book_id}")
+            extracted_count += 1
+
+            if updates:
+                print(f"✓ Applied {len(updates)} update(s) to book {book_id}")
+                enriched_count += 1
+
+            extraction_results.append({
+                'book_id': book_id,
+                'title': titles[book_id],
+                'isbn': isbn,
+                'extracted': True
+            })
+        else:
+            print(f"✗ Failed to update book {book_id}")
             failed_count += 1
-            continue
 
-        # Step 3: Enrich with metadata (if not find-only mode)
-        if not args.find_only:
-            print(f"\nFetching metadata for ISBN {isbn}...")
-            try:
-                metadata = fetch_ebook_metadata(isbn=isbn, timeout=30)
-
-                if not metadata:
-                    print("✗ No metadata found")
-                    continue
-
-                print("✓ Fetched metadata:")
-
-                # Determine what to update
-                updates = {}
-                field_map = {
-                    'Title': 'title',
-                    'Author(s)': 'authors',
-                    'Publisher': 'publisher',
-                    'Comments': 'comments',
-                    'Tags': 'tags',
-                    'Published': 'pubdate',
-                    'Series': 'series'
-                }
-
-                print("\nAvailable updates:")
-                for meta_key, db_field in field_map.items():
-                    if meta_key in metadata and metadata[meta_key]:
-                        value = metadata[meta_key]
-
-                        # Show preview for comments
-                        if meta_key == 'Comments':
-                            preview = value[:100] + "..." if len(value) > 100 else value
-                            print(f"  • {meta_key}: {preview}")
-                        else:
-                            print(f"  • {meta_key}: {value}")
-
-                        updates[db_field] = value
-
-                if not updates:
-                    print("  (No new metadata available)")
-                    continue
-
-                # Apply updates
-                if args.auto_apply:
-                    apply = True
-                else:
-                    response = input(f"\nApply {len(updates)} update(s)? [Y/n]: ")
-                    apply = response.lower() != 'n'
-
-                if apply:
-                    try:
-                        set_metadata(book_id, library_path=args.library_path, **updates)
-                        print(f"✓ Applied {len(updates)} update(s) to book {book_id}")
-                        enriched_count += 1
-                    except Exception as e:
-                        print(f"✗ Failed to apply updates: {e}")
-                else:
-                    print("Skipped metadata updates")
-
-            except Exception as e:
-                print(f"✗ Error fetching metadata: {e}")
-                continue
+    if library is not None:
+        library.close()
 
     # Summary
     print("\n" + "=" * 60)
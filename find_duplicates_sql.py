@@ -11,12 +11,16 @@ Usage:
     python find_duplicates_sql.py --auto-delete --dry-run        # Show what would be deleted
     python find_duplicates_sql.py --auto-delete                  # Delete duplicates automatically
     python find_duplicates_sql.py --format-priority "EPUB,PDF"   # Custom format preference
+    python find_duplicates_sql.py --find-only --create-index     # Index metadata.db for faster runs
 """
 
 import argparse
+import contextlib
+import functools
 import sqlite3
 import subprocess
 import json
+import re
 from pathlib import Path
 from datetime import datetime
 from calibre_tools.config import DEFAULT_CALIBRE_LIBRARY
@@ -25,107 +29,155 @@ from calibre_tools.config import DEFAULT_CALIBRE_LIBRARY
 # Default format preference hierarchy (higher index = higher priority)
 DEFAULT_FORMAT_PRIORITY = ['DJVU', 'AZW3', 'MOBI', 'PDF', 'EPUB']
 
+# Calibre dates look like "2020-01-31 10:00:00+00:00"; any offset is ignored
+_DATE_RE = re.compile(r'(\d{4})-(\d{2})-(\d{2})(?:[ T](\d{2}):(\d{2}):(\d{2}))?')
+_EPOCH = datetime(1970, 1, 1)
 
-def find_duplicates_sql(library_path=DEFAULT_CALIBRE_LIBRARY):
+# Stay below SQLITE_MAX_VARIABLE_NUMBER (999 before SQLite 3.32)
+MAX_SQL_VARIABLES = 900
+
+# Index on the normalized title/author key that duplicates are grouped by
+DUPLICATE_INDEX_NAME = 'idx_books_title_author_norm'
+
+
+def _open_ro(db_path):
+    """Open metadata.db read-only with a large page cache and mmap for scans."""
+    if not db_path.exists():
+        raise Exception(f"Database not found at: {db_path}")
+
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    conn.execute("PRAGMA query_only=1")
+    conn.execute("PRAGMA cache_size=-200000")  # ~200 MB page cache
+    conn.execute("PRAGMA mmap_size=1073741824")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    return conn
+
+
+def find_duplicates_sql(library_path=DEFAULT_CALIBRE_LIBRARY, conn=None):
     """
     Find duplicate books using direct SQL query.
 
+    Args:
+        library_path: Path to Calibre library
+        conn: Connection from _open_ro to reuse (optional)
+
     Returns:
         List of duplicate groups, where each group contains books that are duplicates
     """
-    db_path = Path(library_path) / 'metadata.db'
+    if conn is None:
+        with contextlib.closing(_open_ro(Path(library_path) / 'metadata.db')) as conn:
+            return find_duplicates_sql(library_path, conn)
 
-    if not db_path.exists():
-        raise Exception(f"Database not found at: {db_path}")
-
-    # SQL query to find potential duplicates by title and author
+    # Group books by normalized title and author in a single scan; every
+    # group with more than one book is a set of duplicates
     query = """
-        SELECT
-            b1.id as book1_id,
-            b1.title as book1_title,
-            b1.author_sort as book1_authors,
-            b1.timestamp as book1_timestamp,
-            b1.last_modified as book1_modified,
-            b1.pubdate as book1_pubdate,
-            b2.id as book2_id,
-            b2.title as book2_title,
-            b2.author_sort as book2_authors,
-            b2.timestamp as book2_timestamp,
-            b2.last_modified as book2_modified,
-            b2.pubdate as book2_pubdate,
-            c1.text as book1_comments,
-            c2.text as book2_comments,
-            i1.val as book1_isbn,
-            i2.val as book2_isbn
-        FROM books b1
-        JOIN books b2 ON LOWER(TRIM(b1.title)) = LOWER(TRIM(b2.title))
-            AND LOWER(TRIM(b1.author_sort)) = LOWER(TRIM(b2.author_sort))
-            AND b1.id < b2.id
-        LEFT JOIN comments c1 ON b1.id = c1.book
-        LEFT JOIN comments c2 ON b2.id = c2.book
-        LEFT JOIN identifiers i1 ON b1.id = i1.book AND i1.type = 'isbn'
-        LEFT JOIN identifiers i2 ON b2.id = i2.book AND i2.type = 'isbn'
-        WHERE
-            -- Exclude magazines/periodicals
-            (c1.text IS NULL OR c1.text NOT LIKE '%periodical/magazine issue%')
-            AND (c2.text IS NULL OR c2.text NOT LIKE '%periodical/magazine issue%')
-        ORDER BY b1.id, b2.id
+        SELECT GROUP_CONCAT(b.id) as book_ids
+        FROM books b
+        WHERE b.title IS NOT NULL AND b.author_sort IS NOT NULL
+        GROUP BY LOWER(TRIM(b.title)), LOWER(TRIM(b.author_sort))
+        HAVING COUNT(*) > 1
     """
 
-    # Execute query in read-only mode
-    db_uri = f"file:{db_path}?mode=ro"
-    conn = sqlite3.connect(db_uri, uri=True)
-    conn.row_factory = sqlite3.Row
-
-    try:
-        cursor = conn.cursor()
-        cursor.execute(query)
-        rows = cursor.fetchall()
+    cursor = conn.cursor()
+    cursor.execute(query)
+    groups = [[int(book_id) for book_id in book_ids.split(',')]
+              for (book_ids,) in cursor]
+
+    # Exclude magazines/periodicals. The substring search over comments
+    # can't use an index, so it only runs for books that have a twin.
+    candidate_ids = [book_id for group in groups for book_id in group]
+    periodicals = set()
+    for start in range(0, len(candidate_ids), MAX_SQL_VARIABLES):
+        chunk = candidate_ids[start:start + MAX_SQL_VARIABLES]
+        placeholders = ','.join('?' * len(chunk))
+        cursor.execute(f"""
+            SELECT book FROM comments
+            WHERE book IN ({placeholders})
+                AND text LIKE '%periodical/magazine issue%'
+        """, chunk)
+        periodicals.update(book_id for (book_id,) in cursor)
+
+    # Convert to sorted lists of the remaining duplicates
+    result = []
+    for group in groups:
+        group = sorted(book_id for book_id in group if book_id not in periodicals)
+        if len(group) > 1:
+            result.append(group)
+
+    result.sort()
+    return result
+
+
+def create_duplicate_index(library_path=DEFAULT_CALIBRE_LIBRARY):
+    """
+    Index books by normalized title and author so grouping can walk the index.
 
-        # Group duplicates
-        duplicate_groups = {}
+    This is the only function that writes to metadata.db. Calibre already
+    indexes comments, identifiers and data by book, so only this expression
+    index is added. It stands in for stored normalized title/author
+    columns, which would need triggers on Calibre's books table to stay
+    in sync. The books table is analyzed once, when the index is created,
+    so the planner has sqlite_stat1 entries to choose it.
 
-        for row in rows:
-            book1_id = row['book1_id']
-            book2_id = row['book2_id']
+    Args:
+        library_path: Path to Calibre library
 
-            # Create a key for this duplicate group
-            # Use the smallest book ID as the group key
-            group_key = min(book1_id, book2_id)
+    Returns:
+        True if the index was created, False if it already existed
+    """
+    db_path = Path(library_path) / 'metadata.db'
 
-            if group_key not in duplicate_groups:
-                duplicate_groups[group_key] = set()
+    if not db_path.exists():
+        raise Exception(f"Database not found at: {db_path}")
 
-            duplicate_groups[group_key].add(book1_id)
-            duplicate_groups[group_key].add(book2_id)
+    conn = sqlite3.connect(db_path)
 
-        # Convert to list of lists
-        result = [list(group) for group in duplicate_groups.values()]
+    try:
+        exists = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = ?",
+            (DUPLICATE_INDEX_NAME,)
+        ).fetchone()
+        if exists:
+            return False
 
-        return result
+        with conn:
+            conn.execute(f"""
+                CREATE INDEX {DUPLICATE_INDEX_NAME}
+                ON books(LOWER(TRIM(title)), LOWER(TRIM(author_sort)))
+            """)
+            # Give the planner statistics for the new index
+            conn.execute("ANALYZE books")
+        return True
 
     finally:
         conn.close()
 
 
-def get_book_details(book_ids, library_path=DEFAULT_CALIBRE_LIBRARY):
+def get_book_details(book_ids, library_path=DEFAULT_CALIBRE_LIBRARY, conn=None):
     """
     Get detailed information about books including formats.
 
     Args:
         book_ids: List of book IDs
         library_path: Path to Calibre library
+        conn: Connection from _open_ro to reuse (optional)
 
     Returns:
         Dict mapping book_id to book details
     """
-    db_path = Path(library_path) / 'metadata.db'
-    db_uri = f"file:{db_path}?mode=ro"
-    conn = sqlite3.connect(db_uri, uri=True)
-    conn.row_factory = sqlite3.Row
-
-    try:
-        placeholders = ','.join('?' * len(book_ids))
+    if conn is None:
+        with contextlib.closing(_open_ro(Path(library_path) / 'metadata.db')) as conn:
+            return get_book_details(book_ids, library_path, conn)
+
+    books = {}
+    cursor = conn.cursor()
+    cursor.row_factory = sqlite3.Row
+    cursor.arraysize = 500
+
+    # Query in chunks to stay under SQLite's bound-parameter limit
+    for start in range(0, len(book_ids), MAX_SQL_VARIABLES):
+        chunk = book_ids[start:start + MAX_SQL_VARIABLES]
+        placeholders = ','.join('?' * len(chunk))
         query = f"""
             SELECT
                 b.id,
@@ -134,112 +186,168 @@ def get_book_details(book_ids, library_path=DEFAULT_CALIBRE_LIBRARY):
                 b.timestamp,
                 b.last_modified,
                 b.pubdate,
-                GROUP_CONCAT(d.format, ',') as formats,
                 c.text as comments,
                 i.val as isbn
             FROM books b
-            LEFT JOIN data d ON b.id = d.book
             LEFT JOIN comments c ON b.id = c.book
             LEFT JOIN identifiers i ON b.id = i.book AND i.type = 'isbn'
             WHERE b.id IN ({placeholders})
-            GROUP BY b.id
         """
 
-        cursor = conn.cursor()
-        cursor.execute(query, book_ids)
-        rows = cursor.fetchall()
-
-        books = {}
-        for row in rows:
-            books[row['id']] = {
-                'id': row['id'],
-                'title': row['title'],
-                'authors': row['authors'],
-                'timestamp': row['timestamp'],
-                'last_modified': row['last_modified'],
-                'pubdate': row['pubdate'],
-                'formats': row['formats'].split(',') if row['formats'] else [],
-                'comments': row['comments'],
-                'isbn': row['isbn']
-            }
-
-        return books
+        cursor.execute(query, chunk)
+        while True:
+            rows = cursor.fetchmany()
+            if not rows:
+                break
+
+            for row in rows:
+                books[row['id']] = {
+                    'id': row['id'],
+                    'title': row['title'],
+                    'authors': row['authors'],
+                    'timestamp': row['timestamp'],
+                    'last_modified': row['last_modified'],
+                    'pubdate': row['pubdate'],
+                    'formats': [],
+                    'comments': row['comments'],
+                    'isbn': row['isbn']
+                }
+
+        # Formats are fetched separately rather than concatenated per book
+        cursor.execute(f"""
+            SELECT book, format FROM data
+            WHERE book IN ({placeholders})
+            ORDER BY book, format
+        """, chunk)
+        while True:
+            rows = cursor.fetchmany()
+            if not rows:
+                break
+
+            for row in rows:
+                books[row['book']]['formats'].append(row['format'].upper())
+
+    return books
+
+
+@functools.lru_cache(maxsize=None)
+def _recency(date_str):
+    """Days since the epoch for a Calibre date string, or 0 if it can't be parsed."""
+    match = _DATE_RE.match(date_str)
+    if not match:
+        return 0
 
-    finally:
-        conn.close()
+    try:
+        date_obj = datetime(*(int(part) for part in match.groups() if part is not None))
+    except ValueError:
+        return 0
+
+    return (date_obj - _EPOCH).days
 
 
-def score_book(book, format_priority):
+def score_book(book, format_rank):
     """
     Score a book based on format preference and recency.
 
-    Higher score = better book to keep.
+    Higher score = better book to keep. The score is cached on the book
+    dict, so later calls for the same book are free. main() fills that
+    cache for all duplicates at once from rank_duplicates_sql.
 
     Args:
         book: Book details dict
-        format_priority: List of formats in order of preference (lowest to highest)
+        format_rank: Dict mapping uppercase format to its priority (higher is preferred)
 
     Returns:
         Score (higher is better)
     """
-    score = 0
+    score = book.get('_score')
+    if score is not None:
+        return score
 
     # Format score (most important)
     # Give points based on best format available
-    max_format_score = 0
-    for fmt in book['formats']:
-        if fmt in format_priority:
-            format_score = format_priority.index(fmt)
-            max_format_score = max(max_format_score, format_score)
-
-    score += max_format_score * 1000  # Format is most important
+    max_format_score = max(
+        (format_rank.get(fmt, 0) for fmt in book['formats']), default=0
+    )
+    score = max_format_score * 1000  # Format is most important
 
     # Recency score (secondary)
     # Use last_modified if available, otherwise timestamp
     date_str = book['last_modified'] or book['timestamp']
     if date_str:
-        try:
-            # Parse date and convert to score (more recent = higher score)
-            date_obj = datetime.fromisoformat(date_str.replace('T', ' ').split('+')[0])
-            # Days since epoch / 1000 to keep score manageable
-            recency_score = int(date_obj.timestamp() / 86400)
-            score += recency_score
-        except:
-            pass
+        # Days since epoch keeps the score manageable
+        score += _recency(date_str)
 
     # Number of formats bonus (having multiple formats is good)
     score += len(book['formats']) * 10
 
+    book['_score'] = score
     return score
 
 
-def determine_keeper(duplicate_group, books, format_priority):
+def rank_duplicates_sql(duplicate_groups, format_rank, conn):
     """
-    Determine which book to keep in a duplicate group.
+    Score duplicates and rank them within their group using SQL.
+
+    Scores match score_book: best format rank * 1000, plus days since the
+    epoch of the last change, plus 10 per format. A window function ranks
+    each group by score, ties going to the lowest book ID.
 
     Args:
-        duplicate_group: List of book IDs that are duplicates
-        books: Dict of book details
-        format_priority: List of formats in order of preference
+        duplicate_groups: List of duplicate groups (lists of book IDs)
+        format_rank: Dict mapping format to its priority (higher is preferred)
+        conn: Connection from _open_ro
 
     Returns:
-        Tuple of (keeper_id, books_to_delete)
+        Dict mapping book_id to (score, rank), where rank 1 is the keeper
     """
-    # Score each book
-    scored_books = []
-    for book_id in duplicate_group:
-        book = books[book_id]
-        score = score_book(book, format_priority)
-        scored_books.append((book_id, score, book))
+    rank_params = [value for item in format_rank.items() for value in item]
+    max_books = (MAX_SQL_VARIABLES - len(rank_params)) // 2
+
+    # Keep whole groups in each chunk so the window sees every member
+    chunks = [[]]
+    for group_no, group in enumerate(duplicate_groups):
+        if chunks[-1] and len(chunks[-1]) + len(group) > max_books:
+            chunks.append([])
+        chunks[-1].extend((book_id, group_no) for book_id in group)
+
+    ranked = {}
+    for chunk in chunks:
+        if not chunk:
+            continue
 
-    # Sort by score (descending)
-    scored_books.sort(key=lambda x: x[1], reverse=True)
+        rank_values = ','.join(['(?, ?)'] * len(format_rank)) or '(NULL, NULL)'
+        group_values = ','.join(['(?, ?)'] * len(chunk))
+        query = f"""
+            WITH
+                ranks(format, rank) AS (VALUES {rank_values}),
+                grouped(book, grp) AS (VALUES {group_values}),
+                scored AS (
+                    SELECT
+                        g.book,
+                        g.grp,
+                        COALESCE(MAX(r.rank), 0) * 1000
+                        + COALESCE(CAST(julianday(substr(COALESCE(b.last_modified, b.timestamp), 1, 19))
+                                        - 2440587.5 AS INTEGER), 0)
+                        + COUNT(d.format) * 10 as score
+                    FROM grouped g
+                    JOIN books b ON b.id = g.book
+                    LEFT JOIN data d ON d.book = b.id
+                    LEFT JOIN ranks r ON r.format = UPPER(d.format)
+                    GROUP BY g.book
+                )
+            SELECT
+                book,
+                score,
+                ROW_NUMBER() OVER (PARTITION BY grp ORDER BY score DESC, book) as rk
+            FROM scored
+        """
 
-    # Keep the highest scoring book
-    keeper_id = scored_books[0][0]
-    books_to_delete = [b[0] for b in scored_books[1:]]
+        params = rank_params + [value for pair in chunk for value in pair]
+        for book_id, score, rank in conn.execute(query, params):
+            ranked[book_id] = (score, rank)
 
-    return keeper_id, books_to_delete
+    return ranked
 
 
 def delete_book(book_id, library_path=DEFAULT_CALIBRE_LIBRARY, dry_run=False):
@@ -277,25 +385,94 @@ def delete_book(book_id, library_path=DEFAULT_CALIBRE_LIBRARY, dry_run=False):
         return False
 
 
-def log_deletion(book, log_file):
+def _existing_book_ids(book_ids, library_path):
+    """Return the subset of book_ids still present in the library's metadata.db."""
+    book_ids = list(book_ids)
+    existing = set()
+    with contextlib.closing(_open_ro(Path(library_path) / 'metadata.db')) as conn:
+        for start in range(0, len(book_ids), MAX_SQL_VARIABLES):
+            chunk = book_ids[start:start + MAX_SQL_VARIABLES]
+            placeholders = ','.join('?' * len(chunk))
+            existing.update(row[0] for row in conn.execute(
+                f"SELECT id FROM books WHERE id IN ({placeholders})", chunk))
+    return existing
+
+
+def delete_books(book_ids, library_path=DEFAULT_CALIBRE_LIBRARY, dry_run=False):
+    """
+    Delete several books from Calibre library with one calibredb call.
+
+    If the batch fails, the books it did remove are counted as deleted and
+    the rest are retried on their own so the failing ones are reported
+    individually.
+
+    Args:
+        book_ids: Book IDs to delete
+        library_path: Path to Calibre library
+        dry_run: If True, don't actually delete
+
+    Returns:
+        Set of book IDs that were deleted (all of them for a dry run)
+    """
+    if dry_run or not book_ids:
+        return set(book_ids)
+
+    try:
+        cmd = [
+            'calibredb', 'remove',
+            '--library-path', library_path,
+            ','.join(str(book_id) for book_id in book_ids)
+        ]
+
+        result = subprocess.run(cmd, capture_output=True, text=True)
+
+        if result.returncode == 0:
+            return set(book_ids)
+
+        print(f"    ✗ Batch delete failed, retrying one at a time: {result.stderr}")
+
+    except Exception as e:
+        print(f"    ✗ Exception in batch delete, retrying one at a time: {e}")
+
+    # calibredb may have removed some books before failing; only the ones
+    # still in the library are retried
+    try:
+        remaining = _existing_book_ids(book_ids, library_path)
+    except Exception as e:
+        print(f"    ⚠ Could not check which books remain, retrying all: {e}")
+        remaining = set(book_ids)
+
+    deleted = {book_id for book_id in book_ids if book_id not in remaining}
+    if deleted:
+        print(f"    ✓ Already removed by the batch: {', '.join(map(str, sorted(deleted)))}")
+
+    retry_ids = [book_id for book_id in book_ids if book_id in remaining]
+    # One at a time: concurrent calibredb writers fail with "database is locked"
+    deleted.update(book_id for book_id in retry_ids if delete_book(book_id, library_path))
+
+    return deleted
+
+
+def log_deletion(book, log):
     """
     Log a book deletion to a file for recovery.
 
     Args:
         book: Book details dict
-        log_file: Path to log file
+        log: Log file opened for appending
     """
-    with open(log_file, 'a') as f:
-        timestamp = datetime.now().isoformat()
-        f.write(f"\n{'=' * 80}\n")
-        f.write(f"Deleted: {timestamp}\n")
-        f.write(f"Book ID: {book['id']}\n")
-        f.write(f"Title: {book['title']}\n")
-        f.write(f"Authors: {book['authors']}\n")
-        f.write(f"Formats: {', '.join(book['formats'])}\n")
-        f.write(f"ISBN: {book['isbn']}\n")
-        f.write(f"Timestamp: {book['timestamp']}\n")
-        f.write(f"Last Modified: {book['last_modified']}\n")
+    timestamp = datetime.now().isoformat()
+    log.write(
+        f"\n{'=' * 80}\n"
+        f"Deleted: {timestamp}\n"
+        f"Book ID: {book['id']}\n"
+        f"Title: {book['title']}\n"
+        f"Authors: {book['authors']}\n"
+        f"Formats: {', '.join(book['formats'])}\n"
+        f"ISBN: {book['isbn']}\n"
+        f"Timestamp: {book['timestamp']}\n"
+        f"Last Modified: {book['last_modified']}\n"
+    )
 
 
 def main():
@@ -334,11 +511,17 @@ def main():
         default=DEFAULT_CALIBRE_LIBRARY,
         help=f'Path to Calibre library (default: {DEFAULT_CALIBRE_LIBRARY})'
     )
+    parser.add_argument(
+        '--create-index',
+        action='store_true',
+        help='Add a title/author index to metadata.db to speed up later runs (writes to the library)'
+    )
 
     args = parser.parse_args()
 
     # Parse format priority
     format_priority = [f.strip().upper() for f in args.format_priority.split(',')]
+    format_rank = {fmt: i for i, fmt in enumerate(format_priority)}
 
     print("=" * 80)
     print("FIND AND MANAGE DUPLICATES")
@@ -355,34 +538,51 @@ def main():
         print("Mode: Auto-delete (based on smart rules)")
     print()
 
+    if args.create_index:
+        if create_duplicate_index(args.library_path):
+            print(f"✓ Created index {DUPLICATE_INDEX_NAME}")
+        else:
+            print(f"✓ Index {DUPLICATE_INDEX_NAME} already exists")
+        print()
+
     # Find duplicates
     print("Finding duplicates using SQL...")
-    duplicate_groups = find_duplicates_sql(args.library_path)
+    with contextlib.closing(_open_ro(Path(args.library_path) / 'metadata.db')) as conn:
+        duplicate_groups = find_duplicates_sql(args.library_path, conn)
 
-    if not duplicate_groups:
-        print("✓ No duplicates found!")
-        return
+        if not duplicate_groups:
+            print("✓ No duplicates found!")
+            return
 
-    print(f"\nFound {len(duplicate_groups)} duplicate group(s):")
-    print("-" * 80)
+        print(f"\nFound {len(duplicate_groups)} duplicate group(s):")
+        print("-" * 80)
+
+        # Get details for all books in duplicate groups
+        all_book_ids = []
+        for group in duplicate_groups:
+            all_book_ids.extend(group)
 
-    # Get details for all books in duplicate groups
-    all_book_ids = []
-    for group in duplicate_groups:
-        all_book_ids.extend(group)
+        books = get_book_details(all_book_ids, args.library_path, conn)
 
-    books = get_book_details(all_book_ids, args.library_path)
+        # Score and rank every duplicate in one query; score_book then
+        # returns the cached score for display
+        ranked = rank_duplicates_sql(duplicate_groups, format_rank, conn)
+        for book_id, (score, rank) in ranked.items():
+            books[book_id]['_score'] = score
+            books[book_id]['_rank'] = rank
 
     # Process each duplicate group
     deletion_log = []
+    pending_deletes = []
     total_to_delete = 0
 
     for i, group in enumerate(duplicate_groups, 1):
         print(f"\nDuplicate Group {i}:")
         print("-" * 80)
 
-        # Determine keeper
-        keeper_id, to_delete = determine_keeper(group, books, format_priority)
+        # Keeper and deletion order come from the SQL ranking
+        ranked_group = sorted(group, key=lambda book_id: books[book_id]['_rank'])
+        keeper_id, to_delete = ranked_group[0], ranked_group[1:]
 
         # Display all books in group
         for book_id in group:
@@ -399,7 +599,7 @@ def main():
             if book['isbn']:
                 print(f"      ISBN: {book['isbn']}")
 
-            score = score_book(book, format_priority)
+            score = score_book(book, format_rank)
             print(f"      Score: {score}")
 
         # Handle deletion
@@ -426,7 +626,7 @@ def main():
                     print("  Invalid input, skipping")
                     continue
 
-        # Delete books
+        # Queue books for deletion; they are removed together below
         if not args.find_only:
             for book_id in to_delete:
                 book = books[book_id]
@@ -435,13 +635,21 @@ def main():
                     print(f"  [DRY RUN] Would delete book {book_id}: {book['title']}")
                     total_to_delete += 1
                 else:
-                    print(f"  Deleting book {book_id}: {book['title']}...")
-                    if delete_book(book_id, args.library_path, args.dry_run):
-                        print(f"    ✓ Deleted successfully")
-                        deletion_log.append(book)
-                        total_to_delete += 1
-                    else:
-                        print(f"    ✗ Failed to delete")
+                    print(f"  Will delete book {book_id}: {book['title']}")
+                    pending_deletes.append(book_id)
+
+    if pending_deletes:
+        print(f"\nDeleting {len(pending_deletes)} book(s)...")
+        deleted = delete_books(pending_deletes, args.library_path)
+
+        for book_id in pending_deletes:
+            book = books[book_id]
+            if book_id in deleted:
+                print(f"  ✓ Deleted book {book_id}: {book['title']}")
+                deletion_log.append(book)
+                total_to_delete += 1
+            else:
+                print(f"  ✗ Failed to delete book {book_id}: {book['title']}")
 
     # Summary
     print("\n" + "=" * 80)
@@ -460,8 +668,9 @@ def main():
         log_file = Path.home() / '.calibre_tools' / 'deletion_log.txt'
         log_file.parent.mkdir(exist_ok=True)
 
-        for book in deletion_log:
-            log_deletion(book, log_file)
+        with open(log_file, 'a', buffering=1 << 16) as log:
+            for book in deletion_log:
+                log_deletion(book, log)
 
         print(f"\nDeletion log saved to: {log_file}")
         print("You can use this log to recover deleted books if needed.")
@@ -10,10 +10,15 @@ from pathlib import Path
 # Add project to path
 sys.path.insert(0, str(Path(__file__).parent))
 
-from calibre_tools import cli_wrapper, isbn_tools, duplicate_finder, semantic_search
+from calibre_tools import cli_wrapper, isbn_tools, duplicate_finder
 from calibre_tools.config import DEFAULT_CALIBRE_LIBRARY
 import json
 
+try:
+    import readline  # noqa: F401 - gives input() line editing and history on POSIX
+except ImportError:
+    pass
+
 
 def print_section(title):
     """Print a section header"""
@@ -25,8 +30,13 @@ def print_section(title):
 def print_result(result, truncate=True):
     """Pretty print results"""
     if isinstance(result, (list, dict)):
-        result_str = json.dumps(result, indent=2)
-        if truncate and len(result_str) > 1000:
+        # Only serialize the head of long lists when the output is truncated
+        shown = result
+        if truncate and isinstance(result, list) and len(result) > 50:
+            shown = result[:50]
+
+        result_str = json.dumps(shown, indent=2, ensure_ascii=False, default=str)
+        if truncate and (len(result_str) > 1000 or shown is not result):
             print(result_str[:1000] + "\n... (truncated)")
         else:
             print(result_str)
@@ -326,6 +336,9 @@ class ManualTester:
         print("\nNote: This will download/load the embedding model on first run...")
 
         try:
+            # Imported here: it pulls in torch and sentence-transformers
+            from calibre_tools import semantic_search
+
             results = semantic_search.search(
                 query=query,
                 top_n=top_n
@@ -349,6 +362,73 @@ class ManualTester:
 # INTERACTIVE MENU
 # ============================================================
 
+def _ask(prompt, default=""):
+    """Read a stripped line of input, falling back to default when empty"""
+    return input(prompt).strip() or default
+
+
+def _ask_then(prompt, action):
+    """Read a line of input and run action on it, skipping empty input"""
+    value = input(prompt).strip()
+    if value:
+        action(value)
+
+
+def _semantic_search(tester):
+    """Prompt for a query and result count, then run a semantic search"""
+    query = _ask("Search query: ", "fantasy adventure with dragons")
+    top_n = input("Number of results (default 5): ").strip()
+    tester.test_semantic_search(query, int(top_n) if top_n else 5)
+
+
+# Menu printed before each choice, written to stdout in one call
+_MENU_TEXT = "\n".join([
+    "",
+    "=" * 60,
+    "SELECT A TEST:",
+    "=" * 60,
+    "\nCLI WRAPPER:",
+    "  1. List books",
+    "  2. List books with search",
+    "  3. List books sorted",
+    "  4. Search library",
+    "  5. Add book (WARNING: modifies library)",
+    "  6. Remove book (WARNING: modifies library)",
+    "  7. Set metadata (WARNING: modifies library)",
+    "\nISBN TOOLS:",
+    "  8. Validate ISBN",
+    "  9. Extract ISBN from text",
+    "  10. Extract ISBN from file",
+    "  11. Find books by ISBN",
+    "  12. Get book ISBN",
+    "\nDUPLICATE FINDER:",
+    "  13. Find all duplicates",
+    "\nSEMANTIC SEARCH:",
+    "  14. Semantic search",
+    "\nOTHER:",
+    "  0. Exit",
+    "",
+])
+
+# Menu choice -> handler taking the ManualTester
+_MENU = {
+    "1": lambda t: t.test_list_books(),
+    "2": lambda t: t.test_list_books_with_search(_ask("Search term: ", "fantasy")),
+    "3": lambda t: t.test_list_books_sorted(_ask("Sort by (title/author/timestamp): ", "title")),
+    "4": lambda t: t.test_search_library(_ask("Search query (e.g., 'author:tolkien'): ", "author:tolkien")),
+    "5": lambda t: _ask_then("Book file path: ", t.test_add_book),
+    "6": lambda t: _ask_then("Book ID to remove: ", lambda v: t.test_remove_book(int(v))),
+    "7": lambda t: _ask_then("Book ID to modify: ", lambda v: t.test_set_metadata(int(v))),
+    "8": lambda t: t.test_validate_isbn(_ask("ISBN to validate: ", "9780547928227")),
+    "9": lambda t: t.test_extract_isbn_from_text(),
+    "10": lambda t: _ask_then("Ebook file path: ", t.test_extract_isbn_from_file),
+    "11": lambda t: t.test_find_books_by_isbn(_ask("ISBN to search: ", "9780547928227")),
+    "12": lambda t: _ask_then("Book ID: ", lambda v: t.test_get_book_isbn(int(v))),
+    "13": lambda t: t.test_find_all_duplicates(),
+    "14": _semantic_search,
+}
+
+
 def interactive_menu():
     """Interactive testing menu"""
     print("\n" + "=" * 60)
@@ -362,85 +442,18 @@ def interactive_menu():
     tester = ManualTester(library_path)
 
     while True:
-        print("\n" + "=" * 60)
-        print("SELECT A TEST:")
-        print("=" * 60)
-        print("\nCLI WRAPPER:")
-        print("  1. List books")
-        print("  2. List books with search")
-        print("  3. List books sorted")
-        print("  4. Search library")
-        print("  5. Add book (WARNING: modifies library)")
-        print("  6. Remove book (WARNING: modifies library)")
-        print("  7. Set metadata (WARNING: modifies library)")
-
-        print("\nISBN TOOLS:")
-        print("  8. Validate ISBN")
-        print("  9. Extract ISBN from text")
-        print("  10. Extract ISBN from file")
-        print("  11. Find books by ISBN")
-        print("  12. Get book ISBN")
-
-        print("\nDUPLICATE FINDER:")
-        print("  13. Find all duplicates")
-
-        print("\nSEMANTIC SEARCH:")
-        print("  14. Semantic search")
-
-        print("\nOTHER:")
-        print("  0. Exit")
+        sys.stdout.write(_MENU_TEXT)
+        sys.stdout.flush()
 
         choice = input("\nEnter choice: ").strip()
 
         if choice == "0":
             print("Goodbye!")
             break
-        elif choice == "1":
-            tester.test_list_books()
-        elif choice == "2":
-            search = input("Search term: ").strip() or "fantasy"
-            tester.test_list_books_with_search(search)
-        elif choice == "3":
-            sort = input("Sort by (title/author/timestamp): ").strip() or "title"
-            tester.test_list_books_sorted(sort)
-        elif choice == "4":
-            query = input("Search query (e.g., 'author:tolkien'): ").strip() or "author:tolkien"
-            tester.test_search_library(query)
-        elif choice == "5":
-            file_path = input("Book file path: ").strip()
-            if file_path:
-                tester.test_add_book(file_path)
-        elif choice == "6":
-            book_id = input("Book ID to remove: ").strip()
-            if book_id:
-                tester.test_remove_book(int(book_id))
-        elif choice == "7":
-            book_id = input("Book ID to modify: ").strip()
-            if book_id:
-                tester.test_set_metadata(int(book_id))
-        elif choice == "8":
-            isbn = input("ISBN to validate: ").strip() or "9780547928227"
-            tester.test_validate_isbn(isbn)
-        elif choice == "9":
-            tester.test_extract_isbn_from_text()
-        elif choice == "10":
-            file_path = input("Ebook file path: ").strip()
-            if file_path:
-                tester.test_extract_isbn_from_file(file_path)
-        elif choice == "11":
-            isbn = input("ISBN to search: ").strip() or "9780547928227"
-            tester.test_find_books_by_isbn(isbn)
-        elif choice == "12":
-            book_id = input("Book ID: ").strip()
-            if book_id:
-                tester.test_get_book_isbn(int(book_id))
-        elif choice == "13":
-            tester.test_find_all_duplicates()
-        elif choice == "14":
-            query = input("Search query: ").strip() or "fantasy adventure with dragons"
-            top_n = input("Number of results (default 5): ").strip()
-            top_n = int(top_n) if top_n else 5
-            tester.test_semantic_search(query, top_n)
+
+        handler = _MENU.get(choice)
+        if handler:
+            handler(tester)
         else:
             print("Invalid choice")
 
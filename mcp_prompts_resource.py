@@ -1,9 +1,10 @@
 # Add these NEW tools to expose your resources:
 
-@mcp.tool()
-def get_server_info() -> str:
-    """Get information about this MCP server including available tools and capabilities."""
-    return """
+from types import MappingProxyType
+from typing import Final, Mapping
+
+# Tool payloads are fixed text, built once at import
+_SERVER_INFO: Final[str] = """
     Open WebUI MCP Server
     =====================
     Version: 1.0.0
@@ -27,11 +28,7 @@ def get_server_info() -> str:
     - writing_assistant
     """
 
-
-@mcp.tool()
-def get_readme() -> str:
-    """Get comprehensive server documentation and usage guide."""
-    return """
+_README: Final[str] = """
     # MCP Server Documentation
 
     ## Overview
@@ -57,19 +54,8 @@ def get_readme() -> str:
     http://localhost:8005
     """
 
-
-@mcp.tool()
-def get_tool_documentation(tool_name: str) -> str:
-    """
-    Get detailed documentation for a specific tool.
-
-    Parameters
-    ----------
-    tool_name : str
-        The name of the tool: "calculator", "text_analyzer", "string_transformer", or "list_operations"
-    """
-    docs = {
-        "calculator": """
+_TOOL_DOCS: Final[Mapping[str, str]] = MappingProxyType({
+    "calculator": """
         # Calculator Tool
 
         Performs basic arithmetic operations.
@@ -83,7 +69,7 @@ def get_tool_documentation(tool_name: str) -> str:
         calculator(10, 5, "+") -> 15.0
         """,
 
-        "text_analyzer": """
+    "text_analyzer": """
         # Text Analyzer Tool
 
         Analyzes text and returns comprehensive statistics.
@@ -96,7 +82,7 @@ def get_tool_documentation(tool_name: str) -> str:
         average_word_length, and longest_word.
         """,
 
-        "string_transformer": """
+    "string_transformer": """
         # String Transformer Tool
 
         Transforms strings in various ways.
@@ -109,7 +95,7 @@ def get_tool_documentation(tool_name: str) -> str:
         uppercase, lowercase, reverse, title, capitalize, snake_case, camel_case
         """,
 
-        "list_operations": """
+    "list_operations": """
         # List Operations Tool
 
         Performs operations on lists of numbers.
@@ -121,6 +107,29 @@ def get_tool_documentation(tool_name: str) -> str:
         **Operations:**
         sum, average, min, max, sort, reverse, unique
         """
-    }
+})
+
 
-    return docs.get(tool_name, f"No documentation found for tool: {tool_name}")
\ No newline at end of file
+@mcp.tool()
+def get_server_info() -> str:
+    """Get information about this MCP server including available tools and capabilities."""
+    return _SERVER_INFO
+
+
+@mcp.tool()
+def get_readme() -> str:
+    """Get comprehensive server documentation and usage guide."""
+    return _README
+
+
+@mcp.tool()
+def get_tool_documentation(tool_name: str) -> str:
+    """
+    Get detailed documentation for a specific tool.
+
+    Parameters
+    ----------
+    tool_name : str
+        The name of the tool: "calculator", "text_analyzer", "string_transformer", or "list_operations"
+    """
+    return _TOOL_DOCS.get(tool_name, f"No documentation found for tool: {tool_name}")
\ No newline at end of file
@@ -1,10 +1,11 @@
 import asyncio
+import json
 from mcp.server import Server
 from mcp.server.sse import SseServerTransport
 from mcp.types import Prompt, PromptArgument, PromptMessage, TextContent
 from starlette.applications import Starlette
 from starlette.routing import Route, Mount
-from starlette.responses import JSONResponse, Response
+from starlette.responses import Response
 from starlette.middleware.cors import CORSMiddleware
 from starlette.requests import Request
 import uvicorn
@@ -14,84 +15,12 @@ mcp_server = Server("restaurant-prompts")
 
 
 # ---------------------------------------------------------------------------
-# PROMPT HANDLERS
+# PROMPT TEMPLATES
 # ---------------------------------------------------------------------------
 
-@mcp_server.list_prompts()
-async def list_prompts() -> list[Prompt]:
-    """List all available prompts"""
-    return [
-        Prompt(
-            name="analyze-menu",
-            description="Analyze a restaurant menu and provide insights",
-            arguments=[
-                PromptArgument(
-                    name="menu_name",
-                    description="Name of the menu to analyze (e.g., 'menu1', 'menu2')",
-                    required=True
-                ),
-                PromptArgument(
-                    name="focus",
-                    description="What to focus on: 'price', 'variety', 'dietary', or 'all'",
-                    required=False
-                )
-            ]
-        ),
-        Prompt(
-            name="translate-order",
-            description="Help translate a customer's order from English to Japanese",
-            arguments=[
-                PromptArgument(
-                    name="order",
-                    description="The order in English (e.g., 'I want sushi and miso soup')",
-                    required=True
-                )
-            ]
-        ),
-        Prompt(
-            name="recommend-dish",
-            description="Get dish recommendations based on preferences",
-            arguments=[
-                PromptArgument(
-                    name="preference",
-                    description="Customer preference (e.g., 'vegetarian', 'spicy', 'light')",
-                    required=True
-                ),
-                PromptArgument(
-                    name="budget",
-                    description="Budget level: 'low', 'medium', or 'high'",
-                    required=False
-                )
-            ]
-        ),
-        Prompt(
-            name="explain-dish",
-            description="Get a detailed explanation of a Japanese dish",
-            arguments=[
-                PromptArgument(
-                    name="dish_name",
-                    description="Name of the dish to explain",
-                    required=True
-                )
-            ]
-        )
-    ]
-
-
-@mcp_server.get_prompt()
-async def get_prompt(name: str, arguments: dict | None) -> list[PromptMessage]:
-    """Get a specific prompt with its messages"""
-
-    if name == "analyze-menu":
-        menu_name = arguments.get("menu_name", "menu1")
-        focus = arguments.get("focus", "all")
-
-        return [
-            PromptMessage(
-                role="user",
-                content=TextContent(
-                    type="text",
-                    text=f"""Please analyze the menu from {menu_name} and provide insights.
+# Message text for each prompt, filled in with the prompt's arguments
+_TEMPLATES = {
+    "analyze-menu": """Please analyze the menu from {menu_name} and provide insights.
 
 Focus area: {focus}
 
@@ -102,20 +31,9 @@ Please read the menu using the menu://{menu_name} resource and provide:
 4. Dietary options available (vegetarian, vegan, etc.)
 5. Recommendations for different customer types
 
-Format your response in a clear, organized way."""
-                )
-            )
-        ]
-
-    elif name == "translate-order":
-        order = arguments.get("order", "")
+Format your response in a clear, organized way.""",
 
-        return [
-            PromptMessage(
-                role="user",
-                content=TextContent(
-                    type="text",
-                    text=f"""I need help translating this customer order to Japanese:
+    "translate-order": """I need help translating this customer order to Japanese:
 
 "{order}"
 
@@ -124,21 +42,9 @@ Please provide:
 2. Romanization (romaji) for pronunciation
 3. Any cultural notes about ordering this in Japan
 
-Be polite and use appropriate restaurant Japanese."""
-                )
-            )
-        ]
+Be polite and use appropriate restaurant Japanese.""",
 
-    elif name == "recommend-dish":
-        preference = arguments.get("preference", "")
-        budget = arguments.get("budget", "medium")
-
-        return [
-            PromptMessage(
-                role="user",
-                content=TextContent(
-                    type="text",
-                    text=f"""Please recommend dishes based on these criteria:
+    "recommend-dish": """Please recommend dishes based on these criteria:
 
 Customer preference: {preference}
 Budget level: {budget}
@@ -149,20 +55,9 @@ Use the available menu resources (menu://list to see all menus) and suggest:
 3. Price information
 4. Any preparation notes or ingredients to be aware of
 
-Be specific and reference actual dishes from the menus."""
-                )
-            )
-        ]
-
-    elif name == "explain-dish":
-        dish_name = arguments.get("dish_name", "")
+Be specific and reference actual dishes from the menus.""",
 
-        return [
-            PromptMessage(
-                role="user",
-                content=TextContent(
-                    type="text",
-                    text=f"""Please explain the dish: {dish_name}
+    "explain-dish": """Please explain the dish: {dish_name}
 
 Provide:
 1. What this dish is and its origins
@@ -172,14 +67,107 @@ Provide:
 5. Cultural significance if any
 6. Common variations
 
-Be educational but accessible for someone new to Japanese cuisine."""
-                )
+Be educational but accessible for someone new to Japanese cuisine.""",
+}
+
+# Values used for arguments the client leaves out
+_DEFAULTS = {
+    "analyze-menu": {"menu_name": "menu1", "focus": "all"},
+    "translate-order": {"order": ""},
+    "recommend-dish": {"preference": "", "budget": "medium"},
+    "explain-dish": {"dish_name": ""},
+}
+
+# Prompts never change, so the list is built once at import
+_PROMPTS_LIST = [
+    Prompt(
+        name="analyze-menu",
+        description="Analyze a restaurant menu and provide insights",
+        arguments=[
+            PromptArgument(
+                name="menu_name",
+                description="Name of the menu to analyze (e.g., 'menu1', 'menu2')",
+                required=True
+            ),
+            PromptArgument(
+                name="focus",
+                description="What to focus on: 'price', 'variety', 'dietary', or 'all'",
+                required=False
+            )
+        ]
+    ),
+    Prompt(
+        name="translate-order",
+        description="Help translate a customer's order from English to Japanese",
+        arguments=[
+            PromptArgument(
+                name="order",
+                description="The order in English (e.g., 'I want sushi and miso soup')",
+                required=True
+            )
+        ]
+    ),
+    Prompt(
+        name="recommend-dish",
+        description="Get dish recommendations based on preferences",
+        arguments=[
+            PromptArgument(
+                name="preference",
+                description="Customer preference (e.g., 'vegetarian', 'spicy', 'light')",
+                required=True
+            ),
+            PromptArgument(
+                name="budget",
+                description="Budget level: 'low', 'medium', or 'high'",
+                required=False
+            )
+        ]
+    ),
+    Prompt(
+        name="explain-dish",
+        description="Get a detailed explanation of a Japanese dish",
+        arguments=[
+            PromptArgument(
+                name="dish_name",
+                description="Name of the dish to explain",
+                required=True
             )
         ]
+    )
+]
 
-    else:
+
+# ---------------------------------------------------------------------------
+# PROMPT HANDLERS
+# ---------------------------------------------------------------------------
+
+def _wrap_user(text: str) -> list[PromptMessage]:
+    """Wrap prompt text as one user message, skipping validation of the fixed fields"""
+    return [
+        PromptMessage.model_construct(
+            role="user",
+            content=TextContent.model_construct(type="text", text=text)
+        )
+    ]
+
+
+@mcp_server.list_prompts()
+async def list_prompts() -> list[Prompt]:
+    """List all available prompts"""
+    return _PROMPTS_LIST
+
+
+@mcp_server.get_prompt()
+async def get_prompt(name: str, arguments: dict | None) -> list[PromptMessage]:
+    """Get a specific prompt with its messages"""
+    template = _TEMPLATES.get(name)
+    if template is None:
         raise ValueError(f"Unknown prompt: {name}")
 
+    args = {**_DEFAULTS[name], **(arguments or {})}
+
+    return _wrap_user(template.format_map(args))
+
 
 # ---------------------------------------------------------------------------
 # SSE TRANSPORT HANDLERS
@@ -209,47 +197,64 @@ async def handle_messages(scope, receive, send):
 # OTHER ENDPOINTS
 # ---------------------------------------------------------------------------
 
+def _json_bytes(data):
+    """Serialize a payload the same way JSONResponse does"""
+    return json.dumps(data, ensure_ascii=False, allow_nan=False,
+                      indent=None, separators=(",", ":")).encode("utf-8")
+
+
+# These payloads never change, so they are serialized once at import
+_OPENAPI_JSON = _json_bytes({
+    "openapi": "3.0.0",
+    "info": {
+        "title": "Restaurant Prompts MCP Server",
+        "version": "1.0.0",
+        "description": "MCP server providing prompt templates for restaurant operations"
+    },
+    "servers": [{"url": "http://localhost:8003"}],
+    "paths": {
+        "/sse": {"get": {"summary": "SSE endpoint for MCP communication"}},
+        "/message": {"post": {"summary": "POST messages for MCP"}}
+    }
+})
+
+_HEALTH_JSON = _json_bytes({"status": "healthy", "service": "restaurant-prompts"})
+
+_ROOT_JSON = _json_bytes({
+    "service": "Restaurant Prompts MCP Server",
+    "version": "1.0.0",
+    "description": "Provides prompt templates for menu analysis, translation, and recommendations",
+    "endpoints": {
+        "sse": "/sse",
+        "message": "/message/",
+        "health": "/health",
+        "openapi": "/openapi.json"
+    },
+    "available_prompts": [
+        "analyze-menu",
+        "translate-order",
+        "recommend-dish",
+        "explain-dish"
+    ]
+})
+
+# Static discovery documents can be cached by clients for a minute
+_CACHE_HEADERS = {"Cache-Control": "max-age=60"}
+
+
 async def openapi(request):
     """OpenAPI schema for the MCP server"""
-    return JSONResponse({
-        "openapi": "3.0.0",
-        "info": {
-            "title": "Restaurant Prompts MCP Server",
-            "version": "1.0.0",
-            "description": "MCP server providing prompt templates for restaurant operations"
-        },
-        "servers": [{"url": "http://localhost:8003"}],
-        "paths": {
-            "/sse": {"get": {"summary": "SSE endpoint for MCP communication"}},
-            "/message": {"post": {"summary": "POST messages for MCP"}}
-        }
-    })
+    return Response(_OPENAPI_JSON, media_type="application/json", headers=_CACHE_HEADERS)
 
 
 async def health(request):
     """Health check endpoint"""
-    return JSONResponse({"status": "healthy", "service": "restaurant-prompts"})
+    return Response(_HEALTH_JSON, media_type="application/json")
 
 
 async def root(request):
     """Root info endpoint"""
-    return JSONResponse({
-        "service": "Restaurant Prompts MCP Server",
-        "version": "1.0.0",
-        "description": "Provides prompt templates for menu analysis, translation, and recommendations",
-        "endpoints": {
-            "sse": "/sse",
-            "message": "/message/",
-            "health": "/health",
-            "openapi": "/openapi.json"
-        },
-        "available_prompts": [
-            "analyze-menu",
-            "translate-order",
-            "recommend-dish",
-            "explain-dish"
-        ]
-    })
+    return Response(_ROOT_JSON, media_type="application/json", headers=_CACHE_HEADERS)
 
 
 # ---------------------------------------------------------------------------
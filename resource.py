@@ -1,28 +1,77 @@
 import asyncio
+import contextlib
+import json
 import os
+from functools import lru_cache
+import anyio
 from mcp.server import Server
 from mcp.server.sse import SseServerTransport
 from mcp.types import Resource
 from starlette.applications import Starlette
 from starlette.routing import Route, Mount
-from starlette.responses import JSONResponse, Response
+from starlette.responses import FileResponse, PlainTextResponse, Response
+from starlette.middleware import Middleware
 from starlette.middleware.cors import CORSMiddleware
+from starlette.middleware.gzip import GZipMiddleware
 from starlette.requests import Request
 import uvicorn
 
 # Directory where menu files are stored (same directory as this script)
 MENU_DIR = os.path.dirname(os.path.abspath(__file__))
 
+# Scheme prefix shared by all menu resource URIs
+MENU_URI_PREFIX = "menu://"
+
 # Create MCP server
 mcp_server = Server("menu-resources")
 
+# Menu files found by the last directory scan, keyed by MENU_DIR's mtime
+_MENU_CACHE = {"mtime": None, "menus": []}
+
+
+def _scan_menus() -> list[tuple[str, str]]:
+    """Return (menu_id, path) for each menu file, rescanning only when MENU_DIR changes"""
+    mtime = os.stat(MENU_DIR).st_mtime_ns
+    if mtime != _MENU_CACHE["mtime"]:
+        with os.scandir(MENU_DIR) as entries:
+            menus = [(entry.name[:-len(".txt")], entry.path) for entry in entries
+                     if entry.name.startswith("menu") and entry.name.endswith(".txt")]
+        _MENU_CACHE["menus"] = sorted(menus)
+        _MENU_CACHE["mtime"] = mtime
+    return _MENU_CACHE["menus"]
+
+
+@lru_cache(maxsize=64)
+def _read_menu_cached(path: str, mtime_ns: int, size: int) -> str:
+    """Read a menu file; mtime and size are part of the key so edits are picked up"""
+    with open(path, "rb") as f:
+        return f.read().decode("utf-8")
+
+
+def _load_menu(menu_file: str) -> str | None:
+    """Return a menu file's text, or None if it doesn't exist"""
+    try:
+        st = os.stat(menu_file)
+    except FileNotFoundError:
+        return None
+    return _read_menu_cached(menu_file, st.st_mtime_ns, st.st_size)
+
+
 # ---------------------------------------------------------------------------
 # RESOURCE HANDLERS
 # ---------------------------------------------------------------------------
 
+# Resource list built from the scan it was made from; rebuilt when the scan changes
+_RESOURCES_CACHE = {"menus": None, "resources": []}
+
+
 @mcp_server.list_resources()
 async def list_resources() -> list[Resource]:
     """List all available menu resources"""
+    menus = await anyio.to_thread.run_sync(_scan_menus)
+    if menus is _RESOURCES_CACHE["menus"]:
+        return _RESOURCES_CACHE["resources"]
+
     resources = []
 
     # Add a 'list' resource
@@ -34,16 +83,16 @@ async def list_resources() -> list[Resource]:
     ))
 
     # Add individual menu resources
-    for filename in os.listdir(MENU_DIR):
-        if filename.endswith(".txt") and filename.startswith("menu"):
-            menu_id = filename.replace(".txt", "")
-            resources.append(Resource(
-                uri=f"menu://{menu_id}",
-                name=f"Restaurant Menu {menu_id}",
-                description=f"Japanese restaurant menu - {menu_id}",
-                mimeType="text/plain"
-            ))
+    for menu_id, _ in menus:
+        resources.append(Resource(
+            uri=f"menu://{menu_id}",
+            name=f"Restaurant Menu {menu_id}",
+            description=f"Japanese restaurant menu - {menu_id}",
+            mimeType="text/plain"
+        ))
 
+    _RESOURCES_CACHE["resources"] = resources
+    _RESOURCES_CACHE["menus"] = menus
     return resources
 
 
@@ -51,29 +100,26 @@ async def list_resources() -> list[Resource]:
 async def read_resource(uri: str) -> str:
     """Read a specific menu resource - returns the text content"""
 
-    if uri == "menu://list":
+    if not uri.startswith(MENU_URI_PREFIX):
+        return f"Invalid URI: {uri}"
+
+    menu_name = uri[len(MENU_URI_PREFIX):]
+
+    if menu_name == "list":
         # List all available menus
-        menus = []
-        for filename in os.listdir(MENU_DIR):
-            if filename.endswith(".txt") and filename.startswith("menu"):
-                menu_id = filename.replace(".txt", "")
-                menus.append(f"- menu://{menu_id}")
+        menus = [f"- menu://{menu_id}" for menu_id, _ in await anyio.to_thread.run_sync(_scan_menus)]
 
         return "Available menus:\n" + "\n".join(menus) if menus else "No menus found in directory"
 
-    if uri.startswith("menu://"):
-        menu_name = uri.replace("menu://", "")
-        menu_file = os.path.join(MENU_DIR, f"{menu_name}.txt")
-
-        if os.path.exists(menu_file):
-            with open(menu_file, "r", encoding="utf-8") as f:
-                return f.read()
+    menu_file = os.path.join(MENU_DIR, f"{menu_name}.txt")
 
-        available = [f.replace(".txt", "") for f in os.listdir(MENU_DIR)
-                     if f.endswith(".txt") and f.startswith("menu")]
-        return f"Menu '{menu_name}' not found. Available menus: {', '.join(available)}"
+    # File system calls run in a worker thread to keep the event loop free
+    content = await anyio.to_thread.run_sync(_load_menu, menu_file)
+    if content is not None:
+        return content
 
-    return f"Invalid URI: {uri}"
+    available = [menu_id for menu_id, _ in await anyio.to_thread.run_sync(_scan_menus)]
+    return f"Menu '{menu_name}' not found. Available menus: {', '.join(available)}"
 
 # ---------------------------------------------------------------------------
 # SSE TRANSPORT HANDLERS
@@ -102,44 +148,84 @@ async def handle_messages(scope, receive, send):
 # OTHER ENDPOINTS
 # ---------------------------------------------------------------------------
 
+def _json_bytes(data):
+    """Serialize a payload the same way JSONResponse does"""
+    return json.dumps(data, ensure_ascii=False, allow_nan=False,
+                      indent=None, separators=(",", ":")).encode("utf-8")
+
+
+# These payloads never change, so they are serialized once at import
+_OPENAPI_JSON = _json_bytes({
+    "openapi": "3.0.0",
+    "info": {
+        "title": "Menu Resources MCP Server",
+        "version": "1.0.0",
+        "description": "MCP server for accessing Japanese restaurant menus"
+    },
+    "servers": [{"url": "http://localhost:8002"}],
+    "paths": {
+        "/sse": {"get": {"summary": "SSE endpoint for MCP communication"}},
+        "/message": {"post": {"summary": "POST messages for MCP"}}
+    }
+})
+
+_HEALTH_JSON = _json_bytes({"status": "healthy", "service": "menu-resources"})
+
+_ROOT_JSON = _json_bytes({
+    "service": "Menu Resources MCP Server",
+    "version": "1.0.0",
+    "endpoints": {
+        "sse": "/sse",
+        "message": "/message/",
+        "health": "/health",
+        "openapi": "/openapi.json",
+        "menu": "/menu/{name}"
+    },
+    "menu_directory": MENU_DIR
+})
+
+# Static discovery documents can be cached by clients for a minute
+_CACHE_HEADERS = {"Cache-Control": "max-age=60"}
+
+
 async def openapi(request):
     """OpenAPI schema for the MCP server"""
-    return JSONResponse({
-        "openapi": "3.0.0",
-        "info": {
-            "title": "Menu Resources MCP Server",
-            "version": "1.0.0",
-            "description": "MCP server for accessing Japanese restaurant menus"
-        },
-        "servers": [{"url": "http://localhost:8002"}],
-        "paths": {
-            "/sse": {"get": {"summary": "SSE endpoint for MCP communication"}},
-            "/message": {"post": {"summary": "POST messages for MCP"}}
-        }
-    })
+    return Response(_OPENAPI_JSON, media_type="application/json", headers=_CACHE_HEADERS)
 
 async def health(request):
     """Health check endpoint"""
-    return JSONResponse({"status": "healthy", "service": "menu-resources"})
+    return Response(_HEALTH_JSON, media_type="application/json")
 
 async def root(request):
     """Root info endpoint"""
-    return JSONResponse({
-        "service": "Menu Resources MCP Server",
-        "version": "1.0.0",
-        "endpoints": {
-            "sse": "/sse",
-            "message": "/message/",
-            "health": "/health",
-            "openapi": "/openapi.json"
-        },
-        "menu_directory": MENU_DIR
-    })
+    return Response(_ROOT_JSON, media_type="application/json", headers=_CACHE_HEADERS)
+
+async def serve_menu(request):
+    """Serve a menu file's raw bytes straight from disk"""
+    name = request.path_params["name"]
+    # Only names from the directory scan are served, so paths can't escape MENU_DIR
+    menus = dict(await anyio.to_thread.run_sync(_scan_menus))
+    if name not in menus:
+        return PlainTextResponse(f"Menu '{name}' not found", status_code=404)
+    return FileResponse(menus[name], media_type="text/plain; charset=utf-8")
 
 # ---------------------------------------------------------------------------
 # STARLETTE APP SETUP
 # ---------------------------------------------------------------------------
 
+async def _prefetch_menus():
+    """Read every menu into the file cache in parallel so first requests are warm"""
+    menus = await anyio.to_thread.run_sync(_scan_menus)
+    await asyncio.gather(*(anyio.to_thread.run_sync(_load_menu, path) for _, path in menus))
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    """Warm the menu caches before the server starts accepting requests"""
+    await _prefetch_menus()
+    yield
+
+
 app = Starlette(
     routes=[
         Route("/", endpoint=root),
@@ -147,7 +233,11 @@ app = Starlette(
         Mount("/message/", app=sse_transport.handle_post_message),
         Route("/openapi.json", endpoint=openapi),
         Route("/health", endpoint=health),
-    ]
+        # Menu text compresses well; gzip only here so the SSE stream is never buffered
+        Mount("/menu", routes=[Route("/{name}", endpoint=serve_menu)],
+              middleware=[Middleware(GZipMiddleware, minimum_size=500, compresslevel=6)]),
+    ],
+    lifespan=lifespan,
 )
 
 # Enable CORS
@@ -172,5 +262,6 @@ if __name__ == "__main__":
     print("  - Message: http://localhost:8002/message/")
     print("  - Health: http://localhost:8002/health")
     print("  - OpenAPI: http://localhost:8002/openapi.json")
+    print("  - Menu file: http://localhost:8002/menu/{name}")
 
     uvicorn.run(app, host="0.0.0.0", port=8002)
@@ -11,6 +11,9 @@ setup(
         "numpy>=1.20.0",
         "fastmcp>=0.1.0",  # Ensure correct version
     ],
+    extras_require={
+        "fast": ["orjson>=3.0", "lxml>=4.0"],
+    },
     entry_points={
         "console_scripts": [
             "calibre-semantic-search=calibre_tools.semantic_search:main",
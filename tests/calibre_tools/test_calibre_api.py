@@ -0,0 +1,139 @@
+# tests/calibre_tools/test_calibre_api.py
+import pytest
+import sqlite3
+from unittest.mock import patch, MagicMock
+
+
+class TestGetConn:
+    """Test the cached read-only library connections"""
+
+    @pytest.fixture
+    def library(self, temp_dir):
+        conn = sqlite3.connect(f"{temp_dir}/metadata.db")
+        conn.execute("CREATE TABLE books (id INTEGER PRIMARY KEY, title TEXT)")
+        conn.execute("INSERT INTO books (title) VALUES ('The Hobbit')")
+        conn.commit()
+        conn.close()
+        yield temp_dir
+
+        from calibre_tools.calibre_api import close_connections
+        close_connections()
+
+    def test_connection_is_reused(self, library):
+        """Test that one connection is kept per library"""
+        from calibre_tools.calibre_api import get_conn
+
+        conn = get_conn(library)
+        assert get_conn(library) is conn
+        assert conn.execute("SELECT title FROM books").fetchall() == [('The Hobbit',)]
+
+    def test_connection_is_read_only(self, library):
+        """Test that writes through the cached connection are refused"""
+        from calibre_tools.calibre_api import get_conn
+
+        with pytest.raises(sqlite3.OperationalError):
+            get_conn(library).execute("DELETE FROM books")
+
+    def test_missing_database(self, temp_dir):
+        """Test error when the library has no metadata.db"""
+        from calibre_tools.calibre_api import get_conn
+
+        with pytest.raises(Exception, match="Database not found"):
+            get_conn(temp_dir)
+
+
+class TestApplyUpdates:
+    """Test writing reviewed updates to books"""
+
+    @patch('calibre_tools.calibre_api.set_metadata')
+    def test_calibredb_fallback(self, mock_set):
+        """Test that each book gets one calibredb call without a library"""
+        from calibre_tools.calibre_api import apply_pending_updates
+
+        mock_set.side_effect = [True, Exception("calibredb failed")]
+        pending = [
+            (1, '9780547928227', {'publisher': 'Allen & Unwin'}),
+            (2, None, {'comments': 'A classic'}),
+        ]
+
+        results = apply_pending_updates(pending, library_path='/lib')
+
+        assert results == [True, False]
+        mock_set.assert_any_call(1, library_path='/lib', publisher='Allen & Unwin',
+                                 identifiers='isbn:9780547928227')
+
+    @patch('calibre_tools.calibre_api.set_metadata')
+    def test_nothing_to_write(self, mock_set):
+        """Test that a book without updates is skipped"""
+        from calibre_tools.calibre_api import apply_book_updates
+
+        assert apply_book_updates(1) is True
+        mock_set.assert_not_called()
+
+    def test_failed_book_is_rolled_back(self):
+        """Test that a book failing part way through keeps none of its fields"""
+        from calibre_tools.calibre_api import apply_pending_updates
+
+        class SavepointConn:
+            """Nested `with` blocks become savepoints, as with Calibre's apsw connection"""
+
+            def __init__(self):
+                self.db = sqlite3.connect(":memory:", isolation_level=None)
+                self.depth = 0
+
+            def __enter__(self):
+                self.depth += 1
+                self.db.execute(f"SAVEPOINT sp{self.depth}")
+
+            def __exit__(self, exc_type, exc, tb):
+                name = f"sp{self.depth}"
+                self.depth -= 1
+                if exc_type is not None:
+                    self.db.execute(f"ROLLBACK TO {name}")
+                self.db.execute(f"RELEASE {name}")
+                return False
+
+        conn = SavepointConn()
+        conn.db.execute("CREATE TABLE books (id INTEGER PRIMARY KEY, publisher TEXT, comments TEXT)")
+        conn.db.execute("INSERT INTO books (id) VALUES (1), (2)")
+
+        def set_field(field, book_id_to_value):
+            for book_id, value in book_id_to_value.items():
+                conn.db.execute(f"UPDATE books SET {field} = ? WHERE id = ?", (value, book_id))
+
+        library = MagicMock()
+        library.backend.conn = conn
+        library.set_field.side_effect = set_field
+
+        pending = [
+            (1, None, {'publisher': 'Allen & Unwin', 'no_such_column': 'x'}),
+            (2, None, {'publisher': 'Gnome Press', 'comments': 'A classic'}),
+        ]
+        with patch('calibre_tools.calibre_api.field_from_string',
+                   lambda field, value, field_metadata: value, create=True):
+            results = apply_pending_updates(pending, library=library)
+
+        assert results == [False, True]
+        assert conn.db.execute("SELECT * FROM books ORDER BY id").fetchall() == [
+            (1, None, None),
+            (2, 'Gnome Press', 'A classic'),
+        ]
+        library.reload_from_db.assert_called_once()
+
+    def test_conversion_error_writes_nothing(self):
+        """Test that a value Calibre can't convert fails before any field is set"""
+        from calibre_tools.calibre_api import apply_book_updates
+
+        def field_from_string(field, value, field_metadata):
+            if field == 'pubdate':
+                raise ValueError(f"bad date: {value}")
+            return value
+
+        library = MagicMock()
+        with patch('calibre_tools.calibre_api.field_from_string', field_from_string, create=True):
+            result = apply_book_updates(1, '9780547928227', {'pubdate': 'someday'},
+                                        library=library)
+
+        assert result is False
+        library.set_field.assert_not_called()
+        library.reload_from_db.assert_not_called()
@@ -2,6 +2,17 @@
 import pytest
 from unittest.mock import patch, MagicMock
 import json
+import subprocess
+import sys
+import time
+
+from calibre_tools import cli_wrapper
+from calibre_tools.config import get_config
+from calibre_tools.cli_wrapper import (
+    list_books, iter_books, add_book, add_books_bulk, remove_book, set_metadata,
+    set_metadata_bulk, convert_book, search_library, get_book_metadata,
+    fetch_ebook_metadata, fetch_ebook_metadata_many, CalibreError
+)
 
 
 class TestCalibreCLI:
@@ -10,8 +21,6 @@ class TestCalibreCLI:
     @patch('subprocess.run')
     def test_list_books(self, mock_subprocess):
         """Test listing books"""
-        from calibre_tools.cli_wrapper import list_books
-
         mock_books = [
             {'id': 1, 'title': 'The Hobbit', 'authors': ['J.R.R. Tolkien']},
             {'id': 2, 'title': 'Foundation', 'authors': ['Isaac Asimov']}
@@ -36,8 +45,6 @@ class TestCalibreCLI:
     @patch('subprocess.run')
     def test_list_books_with_search(self, mock_subprocess):
         """Test listing books with search term"""
-        from calibre_tools.cli_wrapper import list_books
-
         mock_subprocess.return_value = MagicMock(
             returncode=0,
             stdout=json.dumps([])
@@ -52,8 +59,6 @@ class TestCalibreCLI:
     @patch('subprocess.run')
     def test_list_books_with_sort(self, mock_subprocess):
         """Test listing books with sorting"""
-        from calibre_tools.cli_wrapper import list_books
-
         mock_subprocess.return_value = MagicMock(
             returncode=0,
             stdout=json.dumps([])
@@ -68,8 +73,6 @@ class TestCalibreCLI:
     @patch('subprocess.run')
     def test_list_books_with_limit(self, mock_subprocess):
         """Test listing books with limit"""
-        from calibre_tools.cli_wrapper import list_books
-
         mock_subprocess.return_value = MagicMock(
             returncode=0,
             stdout=json.dumps([])
@@ -84,21 +87,154 @@ class TestCalibreCLI:
     @patch('subprocess.run')
     def test_list_books_failure(self, mock_subprocess):
         """Test handling list_books failure"""
-        from calibre_tools.cli_wrapper import list_books
-
         mock_subprocess.return_value = MagicMock(
             returncode=1,
             stderr='Error: Library not found'
         )
 
+        with pytest.raises(CalibreError, match='Failed to list books: Error: Library not found'):
+            list_books('/fake/library')
+
+    @patch('subprocess.Popen')
+    def test_iter_books(self, mock_popen):
+        """Test streaming books from calibredb list"""
+        import io
+
+        mock_books = [{'id': 1, 'title': 'The Hobbit'}, {'id': 2, 'title': 'Foundation'}]
+        mock_proc = mock_popen.return_value
+        mock_proc.stdout = io.BytesIO(json.dumps(mock_books).encode())
+        mock_proc.wait.return_value = 0
+        mock_proc.poll.return_value = 0
+
+        books = iter_books('/fake/library', search_term='Tolkien')
+
+        assert next(books) == mock_books[0]
+        assert list(books) == mock_books[1:]
+        call_args = mock_popen.call_args[0][0]
+        assert '--for-machine' in call_args
+        assert 'Tolkien' in call_args
+
+    @patch('subprocess.Popen')
+    def test_iter_books_failure(self, mock_popen):
+        """Test that a failed calibredb list raises instead of a JSON error"""
+        import io
+
+        mock_proc = mock_popen.return_value
+        mock_proc.stdout = io.BytesIO(b'')
+        mock_proc.wait.return_value = 1
+        mock_proc.poll.return_value = 1
+
+        with pytest.raises(Exception, match='Failed to list books'):
+            list(iter_books('/fake/library'))
+
+    @patch('subprocess.run')
+    @patch('subprocess.Popen')
+    def test_list_books_large_output(self, mock_popen, mock_subprocess):
+        """Test that large_output reads calibredb's stdout as bytes from a pipe"""
+        import io
+
+        mock_books = [{'id': 1, 'title': 'The Hobbit'}]
+        mock_proc = mock_popen.return_value
+        mock_proc.stdout = io.BytesIO(json.dumps(mock_books).encode())
+        mock_proc.wait.return_value = 0
+
+        assert list_books('/fake/library', large_output=True) == mock_books
+        mock_subprocess.assert_not_called()
+        assert '--for-machine' in mock_popen.call_args[0][0]
+
+        mock_proc.stdout = io.BytesIO(b'')
+        mock_proc.wait.return_value = 1
         with pytest.raises(Exception, match='Failed to list books'):
+            list_books('/fake/library', large_output=True)
+
+    @patch('subprocess.run')
+    def test_list_books_reuses_recent_result(self, mock_subprocess, tmp_path):
+        """Test that identical list calls reuse output until metadata.db changes"""
+        import os
+
+        db = tmp_path / 'metadata.db'
+        db.touch()
+        mock_subprocess.return_value = MagicMock(returncode=0, stdout='[{"id": 1}]')
+
+        assert list_books(str(tmp_path)) == list_books(str(tmp_path)) == [{'id': 1}]
+        assert mock_subprocess.call_count == 1
+
+        list_books(str(tmp_path), search_term='fantasy')
+        assert mock_subprocess.call_count == 2
+
+        stat = db.stat()
+        os.utime(db, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        list_books(str(tmp_path))
+        assert mock_subprocess.call_count == 3
+
+    @patch('subprocess.run')
+    def test_recent_results_are_bounded(self, mock_subprocess, tmp_path):
+        """Test that the oldest reusable list outputs are dropped first"""
+        (tmp_path / 'metadata.db').touch()
+        mock_subprocess.return_value = MagicMock(returncode=0, stdout='[]')
+
+        with patch.object(cli_wrapper, 'RECENT_MAX_ENTRIES', 2):
+            for term in ('a', 'b', 'c'):
+                list_books(str(tmp_path), search_term=term)
+
+        assert len(cli_wrapper._recent) == 2
+        list_books(str(tmp_path), search_term='c')
+        assert mock_subprocess.call_count == 3
+        list_books(str(tmp_path), search_term='a')
+        assert mock_subprocess.call_count == 4
+
+    @patch.dict('os.environ', {'CALIBRE_CLI_TIMEOUT': '42'})
+    @patch('subprocess.run')
+    def test_command_timeout(self, mock_subprocess):
+        """Test that a hung calibre command is reported as a CalibreError"""
+        import subprocess
+
+        mock_subprocess.side_effect = subprocess.TimeoutExpired('calibredb', 300)
+
+        with pytest.raises(CalibreError, match='calibredb timed out'):
             list_books('/fake/library')
 
+        assert mock_subprocess.call_args[1]['timeout'] == 42
+
+    # A calibredb that never answers, and a short deadline for it
+    HANGING_CMD = [sys.executable, '-c', 'import time; time.sleep(30)']
+
+    @pytest.fixture
+    def short_timeout(self):
+        settings = {**get_config(), 'calibre_cli_timeout': 0.2}
+        with patch.object(cli_wrapper, 'get_config', return_value=settings):
+            yield
+
+    def test_large_output_timeout(self, short_timeout):
+        """Test that a hung large-output command is killed and reported"""
+        start = time.monotonic()
+        with pytest.raises(CalibreError, match='timed out after 0.2 seconds'):
+            cli_wrapper._run_large(self.HANGING_CMD)
+        assert time.monotonic() - start < 10
+
+    def test_iter_books_timeout(self, short_timeout):
+        """Test that a hung streaming list is killed and reported"""
+        start = time.monotonic()
+        with patch.object(cli_wrapper, '_list_cmd', return_value=self.HANGING_CMD):
+            with pytest.raises(CalibreError, match='calibredb timed out'):
+                list(iter_books('/fake/library'))
+        assert time.monotonic() - start < 10
+
+    def test_persistent_session_timeout(self, short_timeout):
+        """Test that a session that stops answering is killed and reported"""
+        real_popen = subprocess.Popen
+        session = cli_wrapper._CalibredbSession()
+
+        start = time.monotonic()
+        with patch('subprocess.Popen', lambda cmd, **kwargs: real_popen(self.HANGING_CMD, **kwargs)):
+            with pytest.raises(CalibreError, match='calibredb timed out'):
+                session.run(['calibredb', 'list'])
+        assert time.monotonic() - start < 10
+        assert session._proc is None
+
     @patch('subprocess.run')
     def test_add_book(self, mock_subprocess):
         """Test adding a book"""
-        from calibre_tools.cli_wrapper import add_book
-
         mock_subprocess.return_value = MagicMock(
             returncode=0,
             stdout='Added book ids: 42'
@@ -116,8 +252,6 @@ class TestCalibreCLI:
     @patch('subprocess.run')
     def test_add_book_with_metadata(self, mock_subprocess):
         """Test adding a book with metadata"""
-        from calibre_tools.cli_wrapper import add_book
-
         mock_subprocess.return_value = MagicMock(
             returncode=0,
             stdout='Added book ids: 42'
@@ -142,8 +276,6 @@ class TestCalibreCLI:
     @patch('subprocess.run')
     def test_add_book_failure(self, mock_subprocess):
         """Test handling add_book failure"""
-        from calibre_tools.cli_wrapper import add_book
-
         mock_subprocess.return_value = MagicMock(
             returncode=1,
             stderr='Error: File not found'
@@ -155,8 +287,6 @@ class TestCalibreCLI:
     @patch('subprocess.run')
     def test_add_book_no_id_in_output(self, mock_subprocess):
         """Test add_book when ID not in output"""
-        from calibre_tools.cli_wrapper import add_book
-
         mock_subprocess.return_value = MagicMock(
             returncode=0,
             stdout='Book added successfully'
@@ -166,11 +296,39 @@ class TestCalibreCLI:
 
         assert book_id is None
 
+    @patch('subprocess.run')
+    def test_add_books_bulk(self, mock_subprocess):
+        """Test adding several books one at a time"""
+        import threading
+        import time
+
+        running = threading.Semaphore(1)
+
+        def fake_add(cmd, **kwargs):
+            # Overlapping calibredb writers would hit "database is locked"
+            assert running.acquire(blocking=False), 'calibredb add calls overlapped'
+            time.sleep(0.01)
+            running.release()
+            path = cmd[-1]
+            if path == '/fake/bad.epub':
+                return MagicMock(returncode=1, stderr='Error: File not found')
+            return MagicMock(returncode=0, stdout=f'Added book ids: {len(path)}')
+
+        mock_subprocess.side_effect = fake_add
+
+        results = add_books_bulk(['/fake/a.epub', '/fake/bad.epub', '/fake/bb.epub'],
+                                 '/fake/library', tags='imported')
+
+        assert results['success_count'] == 2
+        assert results['failure_count'] == 1
+        assert results['added_ids'] == [12, 13]
+        assert results['errors'][0]['file_path'] == '/fake/bad.epub'
+        assert mock_subprocess.call_count == 3
+        assert all('imported' in call[0][0] for call in mock_subprocess.call_args_list)
+
     @patch('subprocess.run')
     def test_remove_book(self, mock_subprocess):
         """Test removing a book"""
-        from calibre_tools.cli_wrapper import remove_book
-
         mock_subprocess.return_value = MagicMock(returncode=0)
 
         result = remove_book(42, '/fake/library')
@@ -185,8 +343,6 @@ class TestCalibreCLI:
     @patch('subprocess.run')
     def test_remove_book_permanent(self, mock_subprocess):
         """Test permanently removing a book"""
-        from calibre_tools.cli_wrapper import remove_book
-
         mock_subprocess.return_value = MagicMock(returncode=0)
 
         remove_book(42, '/fake/library', permanent=True)
@@ -197,8 +353,6 @@ class TestCalibreCLI:
     @patch('subprocess.run')
     def test_remove_book_failure(self, mock_subprocess):
         """Test handling remove_book failure"""
-        from calibre_tools.cli_wrapper import remove_book
-
         mock_subprocess.return_value = MagicMock(
             returncode=1,
             stderr='Error: Book not found'
@@ -210,8 +364,6 @@ class TestCalibreCLI:
     @patch('subprocess.run')
     def test_set_metadata(self, mock_subprocess):
         """Test setting book metadata"""
-        from calibre_tools.cli_wrapper import set_metadata
-
         mock_subprocess.return_value = MagicMock(returncode=0)
 
         result = set_metadata(
@@ -233,8 +385,6 @@ class TestCalibreCLI:
     @patch('subprocess.run')
     def test_set_metadata_with_none_values(self, mock_subprocess):
         """Test set_metadata ignores None values"""
-        from calibre_tools.cli_wrapper import set_metadata
-
         mock_subprocess.return_value = MagicMock(returncode=0)
 
         set_metadata(
@@ -253,21 +403,39 @@ class TestCalibreCLI:
     @patch('subprocess.run')
     def test_set_metadata_failure(self, mock_subprocess):
         """Test handling set_metadata failure"""
-        from calibre_tools.cli_wrapper import set_metadata
-
         mock_subprocess.return_value = MagicMock(
             returncode=1,
-            stderr='Error: Book not found'
+            stderr=b'Error: Book not found'
         )
 
-        with pytest.raises(Exception, match='Failed to set metadata'):
+        with pytest.raises(Exception, match='Failed to set metadata: Error: Book not found'):
             set_metadata(42, '/fake/library', title='New Title')
 
+    @patch('subprocess.run')
+    def test_set_metadata_bulk(self, mock_subprocess):
+        """Test setting metadata for several books"""
+        mock_subprocess.side_effect = [
+            MagicMock(returncode=0),
+            MagicMock(returncode=1, stderr=b'Error: Book not found')
+        ]
+
+        results = set_metadata_bulk([
+            {'book_id': 1, 'title': 'New Title', 'authors': None},
+            {'book_id': 2, 'tags': 'fantasy'}
+        ], '/fake/library')
+
+        assert results['updated_ids'] == [1]
+        assert results['failure_count'] == 1
+        assert results['errors'][0]['book_id'] == 2
+
+        first_call = mock_subprocess.call_args_list[0][0][0]
+        assert 'title:New Title' in first_call
+        assert not any('authors' in arg for arg in first_call)
+        assert first_call[-1] == '1'
+
     @patch('subprocess.run')
     def test_convert_book(self, mock_subprocess):
         """Test converting a book"""
-        from calibre_tools.cli_wrapper import convert_book
-
         mock_subprocess.return_value = MagicMock(
             returncode=0,
             stdout='/output/path/book.epub'
@@ -286,8 +454,6 @@ class TestCalibreCLI:
     @patch('subprocess.run')
     def test_convert_book_failure(self, mock_subprocess):
         """Test handling convert_book failure"""
-        from calibre_tools.cli_wrapper import convert_book
-
         mock_subprocess.return_value = MagicMock(
             returncode=1,
             stderr='Error: Conversion failed'
@@ -299,8 +465,6 @@ class TestCalibreCLI:
     @patch('subprocess.run')
     def test_search_library(self, mock_subprocess):
         """Test searching the library"""
-        from calibre_tools.cli_wrapper import search_library
-
         mock_books = [
             {'id': 1, 'title': 'The Hobbit', 'authors': ['J.R.R. Tolkien']}
         ]
@@ -322,8 +486,6 @@ class TestCalibreCLI:
     @patch('subprocess.run')
     def test_search_library_failure(self, mock_subprocess):
         """Test handling search_library failure"""
-        from calibre_tools.cli_wrapper import search_library
-
         mock_subprocess.return_value = MagicMock(
             returncode=1,
             stderr='Error: Invalid search query'
@@ -332,11 +494,78 @@ class TestCalibreCLI:
         with pytest.raises(Exception, match='Failed to search library'):
             search_library('invalid query', '/fake/library')
 
+    @patch('subprocess.run')
+    def test_use_sqlite(self, mock_subprocess, tmp_path):
+        """Test that use_sqlite reads simple listings and searches from metadata.db"""
+        import sqlite3
+
+        conn = sqlite3.connect(tmp_path / 'metadata.db')
+        conn.executescript("""
+            CREATE TABLE books (id INTEGER PRIMARY KEY, title TEXT, sort TEXT, author_sort TEXT);
+            CREATE TABLE authors (id INTEGER PRIMARY KEY, name TEXT);
+            CREATE TABLE books_authors_link (id INTEGER PRIMARY KEY, book INTEGER, author INTEGER);
+            CREATE TABLE tags (id INTEGER PRIMARY KEY, name TEXT);
+            CREATE TABLE books_tags_link (id INTEGER PRIMARY KEY, book INTEGER, tag INTEGER);
+            INSERT INTO books VALUES (1, 'The Hobbit', 'Hobbit, The', 'Tolkien, J.R.R.');
+            INSERT INTO books VALUES (2, 'Foundation', 'Foundation', 'Asimov, Isaac');
+            INSERT INTO authors VALUES (1, 'J.R.R. Tolkien'), (2, 'Isaac Asimov');
+            INSERT INTO books_authors_link VALUES (1, 1, 1), (2, 2, 2);
+            INSERT INTO tags VALUES (1, 'Fantasy');
+            INSERT INTO books_tags_link VALUES (1, 1, 1);
+        """)
+        conn.commit()
+        conn.close()
+
+        books = list_books(str(tmp_path), limit=1, use_sqlite=True)
+        assert books == [{'id': 2, 'title': 'Foundation', 'authors': 'Isaac Asimov'}]
+
+        books = search_library('author:Tolkien', str(tmp_path), use_sqlite=True)
+        assert [book['id'] for book in books] == [1]
+
+        books = list_books(str(tmp_path), search_term='tag:fantasy', use_sqlite=True)
+        assert [book['id'] for book in books] == [1]
+
+        # % and _ are matched literally, not as LIKE wildcards
+        with sqlite3.connect(tmp_path / 'metadata.db') as conn:
+            conn.execute("INSERT INTO books VALUES (3, 'snakeXcase 100 days', 'snakeXcase', '')")
+        conn.close()
+        assert search_library('title:snakeXcase', str(tmp_path), use_sqlite=True)[0]['id'] == 3
+        assert search_library('title:snake_case', str(tmp_path), use_sqlite=True) == []
+        assert search_library('title:"1%"', str(tmp_path), use_sqlite=True) == []
+
+        mock_subprocess.assert_not_called()
+
+        # Queries the translation does not cover still go through calibredb,
+        # including bare words, which calibredb matches against every field
+        mock_subprocess.return_value = MagicMock(returncode=0, stdout='[]')
+        assert search_library('author:*', str(tmp_path), use_sqlite=True) == []
+        assert list_books(str(tmp_path), search_term='fantasy', use_sqlite=True) == []
+        assert mock_subprocess.call_count == 2
+
+    @patch('subprocess.run')
+    @patch('subprocess.Popen')
+    def test_persistent_session(self, mock_popen, mock_subprocess):
+        """Test that calibredb commands reuse one calibre process when persistent mode is on"""
+        mock_books = [{'id': 1, 'title': 'The Hobbit'}]
+        mock_proc = mock_popen.return_value
+        mock_proc.poll.return_value = None
+        mock_proc.stdout.readline.return_value = json.dumps([0, json.dumps(mock_books), '']) + '\n'
+
+        with patch.dict('os.environ', {'CALIBRE_PERSISTENT': '1'}), \
+                patch.object(cli_wrapper, '_session', cli_wrapper._CalibredbSession()):
+            first = cli_wrapper.list_books('/fake/library')
+            second = cli_wrapper.search_library('author:Tolkien', '/fake/library')
+
+        assert first == second == mock_books
+        mock_popen.assert_called_once()
+        mock_subprocess.assert_not_called()
+        request = json.loads(mock_proc.stdin.write.call_args[0][0])
+        assert request == ['list', '--library-path', '/fake/library', '--for-machine',
+                           '--search', 'author:Tolkien']
+
     @patch('subprocess.run')
     def test_default_library_path(self, mock_subprocess):
         """Test that default library path is used"""
-        from calibre_tools.cli_wrapper import list_books
-
         mock_subprocess.return_value = MagicMock(
             returncode=0,
             stdout=json.dumps([])
@@ -348,13 +577,10 @@ class TestCalibreCLI:
         call_args = mock_subprocess.call_args[0][0]
         assert '--library-path' in call_args
 
-    @patch('os.path.expanduser')
+    @patch('calibre_tools.cli_wrapper._HOME', '/home/user')
     @patch('subprocess.run')
-    def test_file_path_expansion(self, mock_subprocess, mock_expanduser):
+    def test_file_path_expansion(self, mock_subprocess):
         """Test that file paths are expanded"""
-        from calibre_tools.cli_wrapper import add_book
-
-        mock_expanduser.return_value = '/home/user/book.epub'
         mock_subprocess.return_value = MagicMock(
             returncode=0,
             stdout='Added book ids: 42'
@@ -362,15 +588,12 @@ class TestCalibreCLI:
 
         add_book('~/book.epub', '/fake/library')
 
-        mock_expanduser.assert_called_once_with('~/book.epub')
         call_args = mock_subprocess.call_args[0][0]
         assert '/home/user/book.epub' in call_args
 
     @patch('subprocess.run')
     def test_get_book_metadata(self, mock_subprocess):
         """Test getting detailed book metadata"""
-        from calibre_tools.cli_wrapper import get_book_metadata
-
         mock_output = """Title               : The Hobbit
 Title sort          : Hobbit, The
 Author(s)           : J.R.R. Tolkien [Tolkien, J.R.R.]
@@ -399,8 +622,6 @@ Comments            : A great fantasy adventure book"""
     @patch('subprocess.run')
     def test_get_book_metadata_as_opf(self, mock_subprocess):
         """Test getting book metadata as OPF XML"""
-        from calibre_tools.cli_wrapper import get_book_metadata
-
         mock_xml = '<?xml version="1.0"?><package>...</package>'
 
         mock_subprocess.return_value = MagicMock(
@@ -414,11 +635,23 @@ Comments            : A great fantasy adventure book"""
         call_args = mock_subprocess.call_args[0][0]
         assert '--as-opf' in call_args
 
+    @patch('subprocess.run')
+    def test_get_book_metadata_as_parsed_opf(self, mock_subprocess):
+        """Test getting book metadata as a parsed OPF element"""
+        mock_subprocess.return_value = MagicMock(
+            returncode=0,
+            stdout='<?xml version="1.0" encoding="utf-8"?>'
+                   '<package xmlns="http://www.idpf.org/2007/opf"><metadata/></package>'
+        )
+
+        root = get_book_metadata(1, '/fake/library', as_opf='parsed')
+
+        assert root.tag == '{http://www.idpf.org/2007/opf}package'
+        assert '--as-opf' in mock_subprocess.call_args[0][0]
+
     @patch('subprocess.run')
     def test_get_book_metadata_failure(self, mock_subprocess):
         """Test handling get_book_metadata failure"""
-        from calibre_tools.cli_wrapper import get_book_metadata
-
         mock_subprocess.return_value = MagicMock(
             returncode=1,
             stderr='Error: Book not found'
@@ -427,11 +660,30 @@ Comments            : A great fantasy adventure book"""
         with pytest.raises(Exception, match='Failed to get book metadata'):
             get_book_metadata(999, '/fake/library')
 
+    @patch('subprocess.run')
+    def test_get_book_metadata_cached(self, mock_subprocess, tmp_path):
+        """Test that metadata is cached until metadata.db changes"""
+        import os
+
+        db = tmp_path / 'metadata.db'
+        db.touch()
+        mock_subprocess.return_value = MagicMock(returncode=0, stdout='Title : The Hobbit')
+
+        assert get_book_metadata(1, str(tmp_path))['Title'] == 'The Hobbit'
+        assert get_book_metadata(1, str(tmp_path))['Title'] == 'The Hobbit'
+        assert mock_subprocess.call_count == 1
+
+        get_book_metadata(1, str(tmp_path), as_opf=True)
+        assert mock_subprocess.call_count == 2
+
+        stat = db.stat()
+        os.utime(db, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        get_book_metadata(1, str(tmp_path))
+        assert mock_subprocess.call_count == 3
+
     @patch('subprocess.run')
     def test_fetch_ebook_metadata_by_identifier(self, mock_subprocess):
         """Test fetching ebook metadata using identifier"""
-        from calibre_tools.cli_wrapper import fetch_ebook_metadata
-
         mock_output = """Title               : The Bride
 Author(s)           : Julie Garwood
 Publisher           : Berkley
@@ -461,8 +713,6 @@ Identifiers         : goodreads:39799149, amazon:B004XFYWNY"""
     @patch('subprocess.run')
     def test_fetch_ebook_metadata_by_isbn(self, mock_subprocess):
         """Test fetching ebook metadata using ISBN"""
-        from calibre_tools.cli_wrapper import fetch_ebook_metadata
-
         mock_output = """Title               : The Hobbit
 Author(s)           : J.R.R. Tolkien"""
 
@@ -481,8 +731,6 @@ Author(s)           : J.R.R. Tolkien"""
     @patch('subprocess.run')
     def test_fetch_ebook_metadata_by_title_author(self, mock_subprocess):
         """Test fetching ebook metadata using title and author"""
-        from calibre_tools.cli_wrapper import fetch_ebook_metadata
-
         mock_output = """Title               : Foundation
 Author(s)           : Isaac Asimov"""
 
@@ -503,8 +751,6 @@ Author(s)           : Isaac Asimov"""
     @patch('subprocess.run')
     def test_fetch_ebook_metadata_as_opf(self, mock_subprocess):
         """Test fetching ebook metadata as OPF XML"""
-        from calibre_tools.cli_wrapper import fetch_ebook_metadata
-
         mock_xml = '<?xml version="1.0"?><package>...</package>'
 
         mock_subprocess.return_value = MagicMock(
@@ -521,8 +767,6 @@ Author(s)           : Isaac Asimov"""
     @patch('subprocess.run')
     def test_fetch_ebook_metadata_with_plugins(self, mock_subprocess):
         """Test fetching ebook metadata with specific plugins"""
-        from calibre_tools.cli_wrapper import fetch_ebook_metadata
-
         mock_output = """Title               : Test Book"""
 
         mock_subprocess.return_value = MagicMock(
@@ -542,16 +786,12 @@ Author(s)           : Isaac Asimov"""
 
     def test_fetch_ebook_metadata_no_params(self):
         """Test fetch_ebook_metadata raises error without parameters"""
-        from calibre_tools.cli_wrapper import fetch_ebook_metadata
-
         with pytest.raises(ValueError, match='Must specify at least one'):
             fetch_ebook_metadata()
 
     @patch('subprocess.run')
     def test_fetch_ebook_metadata_failure(self, mock_subprocess):
         """Test handling fetch_ebook_metadata failure"""
-        from calibre_tools.cli_wrapper import fetch_ebook_metadata
-
         mock_subprocess.return_value = MagicMock(
             returncode=1,
             stderr='Error: No metadata found'
@@ -559,3 +799,54 @@ Author(s)           : Isaac Asimov"""
 
         with pytest.raises(Exception, match='Failed to fetch ebook metadata'):
             fetch_ebook_metadata(isbn="invalid")
+
+    @patch('subprocess.run')
+    def test_fetch_ebook_metadata_many(self, mock_subprocess):
+        """Test concurrent metadata lookups keep input order"""
+        def fake_fetch(cmd, **kwargs):
+            isbn = cmd[cmd.index('--isbn') + 1]
+            if isbn == 'bad':
+                return MagicMock(returncode=1, stderr='Error: No metadata found')
+            return MagicMock(returncode=0, stdout=f'Identifiers : isbn:{isbn}')
+
+        mock_subprocess.side_effect = fake_fetch
+
+        results = fetch_ebook_metadata_many([{'isbn': '1'}, {'isbn': 'bad'}, {'isbn': '3'}])
+
+        assert [r and r['Identifiers'] for r in results] == ['isbn:1', None, 'isbn:3']
+        assert mock_subprocess.call_count == 3
+
+    @patch('subprocess.run')
+    def test_fetch_ebook_metadata_disk_cache(self, mock_subprocess, tmp_path):
+        """Test that FETCH_CACHE keeps fetched metadata on disk"""
+        mock_subprocess.return_value = MagicMock(returncode=0, stdout='Title : The Hobbit')
+
+        with patch.dict('os.environ', {'FETCH_CACHE': '1'}), \
+                patch.object(cli_wrapper, 'DEFAULT_FETCH_CACHE_FILE', str(tmp_path / 'cache.sqlite')):
+            first = fetch_ebook_metadata(isbn='9780547928227')
+            second = fetch_ebook_metadata(isbn='9780547928227')
+            assert mock_subprocess.call_count == 1
+
+            fetch_ebook_metadata(isbn='9780553293357')
+            assert mock_subprocess.call_count == 2
+
+            with patch.dict('os.environ', {'FORCE_REFRESH': '1'}):
+                fetch_ebook_metadata(isbn='9780547928227')
+            assert mock_subprocess.call_count == 3
+
+        assert first == second == {'Title': 'The Hobbit'}
+
+    @patch('subprocess.run')
+    def test_fetch_ebook_metadata_disk_cache_key(self, mock_subprocess, tmp_path):
+        """Test that positional, keyword and default-valued calls share a cache entry"""
+        mock_subprocess.return_value = MagicMock(returncode=0, stdout='Title : The Hobbit')
+
+        with patch.dict('os.environ', {'FETCH_CACHE': '1'}), \
+                patch.object(cli_wrapper, 'DEFAULT_FETCH_CACHE_FILE', str(tmp_path / 'cache.sqlite')):
+            fetch_ebook_metadata('The Hobbit', 'Tolkien')
+            fetch_ebook_metadata(title='The Hobbit', authors='Tolkien')
+            fetch_ebook_metadata(authors='Tolkien', title='The Hobbit', timeout=30)
+            assert mock_subprocess.call_count == 1
+
+            fetch_ebook_metadata('The Hobbit', 'Tolkien', timeout=60)
+            assert mock_subprocess.call_count == 2
@@ -1,5 +1,6 @@
 # tests/calibre_tools/test_config.py
 import os
+import time
 import pytest
 import platform
 from unittest.mock import patch, MagicMock
@@ -33,11 +34,20 @@ class TestConfig:
 
     def test_cache_settings(self):
         """Test cache refresh settings"""
-        from calibre_tools.config import FORCE_REFRESH, CACHE_EXPIRY_DAYS
+        from calibre_tools.config import get_config
 
-        assert isinstance(FORCE_REFRESH, bool)
-        assert isinstance(CACHE_EXPIRY_DAYS, int)
-        assert CACHE_EXPIRY_DAYS >= 0
+        settings = get_config()
+        assert isinstance(settings["force_refresh"], bool)
+        assert isinstance(settings["cache_expiry_days"], int)
+        assert settings["cache_expiry_days"] >= 0
+
+    def test_import_does_not_load_torch(self):
+        """Test that importing config leaves torch and the device probe for later"""
+        import subprocess
+        import sys
+
+        code = "import sys, calibre_tools.config; sys.exit('torch' in sys.modules)"
+        assert subprocess.run([sys.executable, '-c', code]).returncode == 0
 
     @patch.dict(os.environ, {"USE_CUDA": "1"})
     @patch("torch.cuda.is_available", return_value=True)
@@ -77,24 +87,44 @@ class TestConfig:
         device = get_default_device()
         assert device == "cpu"
 
-    @patch.dict(os.environ, {"FORCE_REFRESH": "1"})
-    def test_force_refresh_env_var(self):
-        """Test FORCE_REFRESH environment variable"""
-        # Need to reload module to pick up env var
-        import importlib
-        import calibre_tools.config as config_module
-        importlib.reload(config_module)
-
-        from calibre_tools.config import FORCE_REFRESH
-        assert FORCE_REFRESH is True
-
-    @patch.dict(os.environ, {"CACHE_EXPIRY_DAYS": "14"})
-    def test_cache_expiry_env_var(self):
-        """Test CACHE_EXPIRY_DAYS environment variable"""
-        # Need to reload module to pick up env var
-        import importlib
-        import calibre_tools.config as config_module
-        importlib.reload(config_module)
-
-        from calibre_tools.config import CACHE_EXPIRY_DAYS
-        assert CACHE_EXPIRY_DAYS == 14
+    @pytest.fixture
+    def cache_files(self, temp_dir):
+        """Metadata and embedding cache files written 10 days ago"""
+        paths = []
+        for name in ('metadata.json', 'embeddings.pkl'):
+            path = os.path.join(temp_dir, name)
+            with open(path, 'w') as f:
+                f.write('{}')
+            old_time = time.time() - 10 * 86400
+            os.utime(path, (old_time, old_time))
+            paths.append(path)
+        return paths
+
+    def _searcher(self, cache_files):
+        from calibre_tools.semantic_search import CalibreSemanticSearch
+
+        with patch.object(CalibreSemanticSearch, 'load_or_create_data'):
+            searcher = CalibreSemanticSearch(device='cpu')
+        searcher.metadata_file, searcher.embedding_file = cache_files
+        return searcher
+
+    def test_force_refresh_env_var(self, cache_files, monkeypatch):
+        """Test FORCE_REFRESH set after import still forces a refresh"""
+        monkeypatch.delenv("FORCE_REFRESH", raising=False)
+        monkeypatch.setenv("CACHE_EXPIRY_DAYS", "30")
+        searcher = self._searcher(cache_files)
+        assert searcher._check_refresh_needed() is False
+
+        monkeypatch.setenv("FORCE_REFRESH", "1")
+        assert searcher._check_refresh_needed() is True
+
+    def test_cache_expiry_env_var(self, cache_files, monkeypatch):
+        """Test CACHE_EXPIRY_DAYS decides whether 10-day-old caches are refreshed"""
+        monkeypatch.delenv("FORCE_REFRESH", raising=False)
+        searcher = self._searcher(cache_files)
+
+        monkeypatch.setenv("CACHE_EXPIRY_DAYS", "14")
+        assert searcher._check_refresh_needed() is False
+
+        monkeypatch.setenv("CACHE_EXPIRY_DAYS", "7")
+        assert searcher._check_refresh_needed() is True
@@ -138,6 +138,33 @@ class TestDuplicateFinder:
         assert '1234567890' in duplicates
         assert len(duplicates['1234567890']) == 2
 
+    def test_find_isbn_duplicates_normalizes_isbns(self):
+        """Test ISBNs are normalized and each book is counted once per ISBN"""
+        from calibre_tools.duplicate_finder import find_isbn_duplicates
+
+        books = [
+            {'id': 1, 'isbn': '978-0-547-92822-7', 'identifiers': {'isbn': '9780547928227'}},
+            {'id': 2, 'identifiers': {'ISBN': '978 0547928227'}},
+            {'id': 3, 'identifiers': {'amazon': '9780547928227'}}
+        ]
+
+        duplicates = find_isbn_duplicates(books)
+
+        assert list(duplicates) == ['9780547928227']
+        assert [b['id'] for b in duplicates['9780547928227']] == [1, 2]
+
+    def test_find_isbn_duplicates_keeps_first_seen_order(self):
+        """Test duplicate groups come out in the order their ISBNs were first seen"""
+        from calibre_tools.duplicate_finder import find_isbn_duplicates
+
+        isbns = [f'97805479282{i:02d}' for i in range(20)]
+        books = [
+            {'id': 1, 'isbn': isbns[0], 'identifiers': {f'isbn{i}': isbn for i, isbn in enumerate(isbns)}},
+            {'id': 2, 'identifiers': {f'isbn{i}': isbn for i, isbn in enumerate(reversed(isbns))}},
+        ]
+
+        assert list(find_isbn_duplicates(books)) == isbns
+
     @patch('subprocess.run')
     def test_get_calibre_metadata(self, mock_subprocess, mock_books):
         """Test extracting metadata from Calibre"""
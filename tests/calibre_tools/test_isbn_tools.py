@@ -1,6 +1,6 @@
 # tests/calibre_tools/test_isbn_tools.py
 import pytest
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock
 import json
 
 
@@ -143,6 +143,41 @@ class TestISBNTools:
         with pytest.raises(FileNotFoundError, match='File not found'):
             extract_isbn_from_file('/fake/nonexistent.epub')
 
+    @patch('os.path.isfile', return_value=True)
+    @patch('asyncio.create_subprocess_exec')
+    def test_extract_isbn_from_file_async(self, mock_exec, mock_isfile):
+        """Test extracting ISBN from ebook file asynchronously"""
+        import asyncio
+        from calibre_tools.isbn_tools import extract_isbn_from_file_async
+
+        mock_proc = MagicMock(returncode=0)
+        mock_proc.communicate = AsyncMock(
+            return_value=(b"Title: Test Book\nIdentifiers: isbn:9780306406157", b"")
+        )
+        mock_exec.return_value = mock_proc
+
+        isbns = asyncio.run(extract_isbn_from_file_async('/fake/book.epub'))
+
+        assert isbns == ['9780306406157']
+        assert mock_exec.call_args[0] == ('ebook-meta', '/fake/book.epub')
+
+    @patch('calibre_tools.isbn_tools.extract_isbn_from_file_async')
+    def test_bulk_extract(self, mock_extract):
+        """Test bulk extraction keeps per-file results and errors"""
+        from calibre_tools.isbn_tools import bulk_extract
+
+        async def fake_extract(path):
+            if path == '/fake/missing.epub':
+                raise FileNotFoundError(path)
+            return ['9780306406157']
+
+        mock_extract.side_effect = fake_extract
+
+        results = bulk_extract(['/fake/a.epub', '/fake/missing.epub'], concurrency=2)
+
+        assert results['/fake/a.epub'] == ['9780306406157']
+        assert isinstance(results['/fake/missing.epub'], FileNotFoundError)
+
     @patch('subprocess.run')
     def test_find_books_by_isbn(self, mock_subprocess):
         """Test finding books by ISBN"""
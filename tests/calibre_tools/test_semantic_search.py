@@ -66,6 +66,27 @@ class TestCalibreSemanticSearch:
             assert 'Middle Earth' in text
             assert 'great fantasy novel' in text  # HTML stripped
 
+    def test_create_searchable_text_layout(self):
+        """Test the exact layout of searchable text and skipping of empty fields"""
+        from calibre_tools.semantic_search import CalibreSemanticSearch
+
+        book = {
+            'title': 'Dune',
+            'authors': ['Frank Herbert'],
+            'series': None,
+            'tags': 'sci-fi',
+            'comments': '<p>Desert <b>planet</b></p>'
+        }
+
+        with patch.object(CalibreSemanticSearch, 'load_or_create_data'):
+            searcher = CalibreSemanticSearch()
+            text = searcher._create_searchable_text(book)
+
+        assert text == (
+            "Title: Dune | Dune | Authors: Frank Herbert | Tags: sci-fi | "
+            "Description: Desert planet | Desert planet"
+        )
+
     def test_prepare_metadata_for_embedding(self, mock_books):
         """Test preparing metadata for embedding"""
         from calibre_tools.semantic_search import CalibreSemanticSearch
@@ -105,8 +126,8 @@ class TestCalibreSemanticSearch:
             pickle.dump({}, f)
 
         with patch.object(CalibreSemanticSearch, 'load_or_create_data'):
-            with patch('calibre_tools.semantic_search.FORCE_REFRESH', False):
-                with patch('calibre_tools.semantic_search.CACHE_EXPIRY_DAYS', 7):
+            with patch.dict(os.environ, {'FORCE_REFRESH': '0'}):
+                with patch.dict(os.environ, {'CACHE_EXPIRY_DAYS': '7'}):
                     searcher = CalibreSemanticSearch()
                     searcher.metadata_file = metadata_file
                     searcher.embedding_file = embedding_file
@@ -131,7 +152,7 @@ class TestCalibreSemanticSearch:
         os.utime(metadata_file, (old_time, old_time))
 
         with patch.object(CalibreSemanticSearch, 'load_or_create_data'):
-            with patch('calibre_tools.semantic_search.CACHE_EXPIRY_DAYS', 7):
+            with patch.dict(os.environ, {'CACHE_EXPIRY_DAYS': '7'}):
                 searcher = CalibreSemanticSearch()
                 searcher.metadata_file = metadata_file
                 searcher.embedding_file = embedding_file
@@ -236,6 +257,147 @@ class TestCalibreSemanticSearch:
                 call_args = mock_cosine.call_args[0]
                 assert call_args[1].shape[0] == 2  # Both embeddings
 
+    def test_search_with_pca(self):
+        """Test that PCA reduces both the index and the query before comparing"""
+        from calibre_tools.semantic_search import CalibreSemanticSearch
+
+        with patch.object(CalibreSemanticSearch, 'load_or_create_data'):
+            searcher = CalibreSemanticSearch(pca_dim=3)
+            searcher.embeddings_dict = {str(i): np.random.rand(384) for i in range(1, 6)}
+            searcher.book_metadata = {str(i): {'id': i} for i in range(1, 6)}
+            searcher.model = MagicMock()
+            searcher.model.encode.return_value = np.random.rand(384)
+
+            with patch('calibre_tools.semantic_search.cosine_similarity') as mock_cosine:
+                mock_cosine.return_value = np.array([[0.1, 0.9, 0.3, 0.2, 0.5]])
+                results = searcher.search('test query', top_n=2)
+
+            query, matrix = mock_cosine.call_args[0]
+            assert query.shape == (1, 3)
+            assert matrix.shape == (5, 3)
+            assert [r['metadata']['id'] for r in results] == [2, 5]
+
+    def test_graph_encoder_returns_a_copy(self):
+        """Test that a replayed embedding is not overwritten by the next query"""
+        import threading
+        import torch
+        from calibre_tools.semantic_search import _CudaGraphEncoder
+
+        encoder = _CudaGraphEncoder.__new__(_CudaGraphEncoder)
+        encoder.seq_len = 8
+        encoder._lock = threading.Lock()
+        encoder.static_inputs = {'input_ids': torch.zeros((1, 8), dtype=torch.long)}
+        encoder.static_output = torch.zeros((1, 4))
+        encoder.model = MagicMock()
+        encoder.model.tokenize.side_effect = lambda texts: {
+            'input_ids': torch.full((1, len(texts[0])), len(texts[0]))
+        }
+        encoder.graph = MagicMock()
+        encoder.graph.replay.side_effect = lambda: encoder.static_output.copy_(
+            encoder.static_inputs['input_ids'][:, :4].float())
+
+        first = encoder.encode('abc')
+        second = encoder.encode('abcde')
+
+        assert first.tolist() == [[3, 3, 3, 0]]
+        assert second.tolist() == [[5, 5, 5, 5]]
+        assert encoder.encode('x' * 9) is None
+
+    def test_quantize(self):
+        """Test int8 quantization keeps values within one scale step"""
+        from calibre_tools.semantic_search import quantize
+
+        embeddings = np.random.randn(4, 384).astype(np.float32)
+        quantized, scales = quantize(embeddings)
+
+        assert quantized.dtype == np.int8
+        assert scales.shape == (4,)
+        assert np.abs(quantized * scales[:, None] - embeddings).max() <= scales.max()
+
+    def test_search_with_int8_index(self, mock_embeddings):
+        """Test that the int8 index ranks books like float cosine similarity"""
+        from calibre_tools.semantic_search import CalibreSemanticSearch
+
+        with patch.object(CalibreSemanticSearch, 'load_or_create_data'):
+            searcher = CalibreSemanticSearch(quantize_int8=True)
+            searcher.embeddings_dict = mock_embeddings
+            searcher.book_metadata = {'1': {'id': 1}, '2': {'id': 2}}
+            searcher.model = MagicMock()
+            searcher.model.encode.return_value = mock_embeddings['2'] + 0.01
+
+            results = searcher.search('test query', top_n=2)
+
+            assert searcher._get_index()[1].dtype == np.int8
+            assert results[0]['metadata']['id'] == 2
+            assert results[0]['score'] == pytest.approx(1.0, abs=0.01)
+
+    def test_int8_search_does_not_upcast_index(self):
+        """Test that int8 scoring never materializes a float copy of the index"""
+        import tracemalloc
+        from calibre_tools.semantic_search import CalibreSemanticSearch
+
+        with patch.object(CalibreSemanticSearch, 'load_or_create_data'):
+            searcher = CalibreSemanticSearch(quantize_int8=True)
+            rng = np.random.default_rng(0)
+            embeddings = rng.standard_normal((20000, 384)).astype(np.float32)
+            searcher.embeddings_dict = {str(i): row for i, row in enumerate(embeddings)}
+            searcher.book_metadata = {str(i): {'id': i} for i in range(len(embeddings))}
+            searcher.model = MagicMock()
+            searcher.model.encode.return_value = embeddings[123]
+
+            matrix = searcher._get_index()[1]
+            tracemalloc.start()
+            try:
+                results = searcher.search('test query', top_n=1)
+                peak = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+
+            assert results[0]['metadata']['id'] == 123
+            assert results[0]['score'] == pytest.approx(1.0, abs=0.01)
+            # A float32 copy of the index alone would be 4x the int8 matrix
+            assert peak < matrix.nbytes
+
+    def test_create_embeddings_multi_process(self, temp_dir):
+        """Test that large libraries are sharded across several GPUs with a pool"""
+        from calibre_tools.semantic_search import CalibreSemanticSearch
+
+        with patch.object(CalibreSemanticSearch, 'load_or_create_data'):
+            searcher = CalibreSemanticSearch(device='cuda')
+            searcher.embedding_file = os.path.join(temp_dir, 'embeddings.pkl')
+            searcher.searchable_texts = {'1': 'The Hobbit', '2': 'Foundation'}
+            searcher.model = MagicMock()
+            searcher.model.encode_multi_process.return_value = np.random.rand(2, 384)
+
+            with patch('calibre_tools.semantic_search.MULTI_PROCESS_MIN_TEXTS', 2), \
+                    patch('torch.cuda.device_count', return_value=2):
+                embeddings = searcher._create_embeddings()
+
+            searcher.model.start_multi_process_pool.assert_called_once_with(
+                target_devices=['cuda:0', 'cuda:1'])
+            searcher.model.stop_multi_process_pool.assert_called_once()
+            searcher.model.encode.assert_not_called()
+            assert set(embeddings) == {'1', '2'}
+
+    def test_create_embeddings_cpu_stays_in_process(self, temp_dir):
+        """Test that CPU embedding never starts a multi-process pool"""
+        from calibre_tools.semantic_search import CalibreSemanticSearch
+
+        with patch.object(CalibreSemanticSearch, 'load_or_create_data'):
+            searcher = CalibreSemanticSearch(device='cpu')
+            searcher.embedding_file = os.path.join(temp_dir, 'embeddings.pkl')
+            searcher.searchable_texts = {'1': 'The Hobbit', '2': 'Foundation'}
+            searcher.model = MagicMock()
+            searcher.model.encode.return_value = np.random.rand(2, 384)
+
+            with patch('calibre_tools.semantic_search.MULTI_PROCESS_MIN_TEXTS', 2), \
+                    patch('os.cpu_count', return_value=4):
+                embeddings = searcher._create_embeddings()
+
+            searcher.model.start_multi_process_pool.assert_not_called()
+            searcher.model.encode.assert_called_once()
+            assert set(embeddings) == {'1', '2'}
+
     def test_singleton_instance(self):
         """Test singleton pattern for search instance"""
         from calibre_tools.semantic_search import get_search_instance
@@ -248,6 +410,37 @@ class TestCalibreSemanticSearch:
             assert mock_class.call_count == 1
             assert instance1 is instance2
 
+    def test_instance_per_library(self):
+        """Test that different libraries get separate search instances"""
+        from calibre_tools.semantic_search import get_search_instance
+
+        with patch('calibre_tools.semantic_search.CalibreSemanticSearch') as mock_class:
+            mock_class.side_effect = lambda **kwargs: MagicMock()
+
+            instance1 = get_search_instance(library_path='/fake/library1')
+            instance2 = get_search_instance(library_path='/fake/library2')
+            instance3 = get_search_instance(library_path='/fake/library1')
+
+            assert mock_class.call_count == 2
+            assert instance1 is not instance2
+            assert instance1 is instance3
+
+    def test_model_shared_between_instances(self):
+        """Test that instances using the same model share one copy of it"""
+        from calibre_tools.semantic_search import CalibreSemanticSearch
+
+        with patch.object(CalibreSemanticSearch, 'load_or_create_data'):
+            searcher1 = CalibreSemanticSearch(library_path='/fake/library1')
+            searcher2 = CalibreSemanticSearch(library_path='/fake/library2')
+            searcher1.model = searcher2.model = None
+
+            with patch('calibre_tools.semantic_search.SentenceTransformer') as mock_st:
+                searcher1._load_model()
+                searcher2._load_model()
+
+                mock_st.assert_called_once()
+                assert searcher1.model is searcher2.model
+
     def test_convenience_search_function(self):
         """Test convenience search function"""
         from calibre_tools.semantic_search import search
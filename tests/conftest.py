@@ -96,19 +96,38 @@ def sample_isbns():
     }
 
 
+def _reset_caches():
+    """
+    Clear module-level caches, only for modules a test has already imported
+    (importing semantic_search pulls in torch and sentence_transformers)
+    """
+    config = sys.modules.get('calibre_tools.config')
+    if config is not None:
+        config.get_default_device.cache_clear()
+
+    ss = sys.modules.get('calibre_tools.semantic_search')
+    if ss is not None:
+        ss._cached_search_instance.cache_clear()
+        ss.CalibreSemanticSearch._get_model.cache_clear()
+
+    cli = sys.modules.get('calibre_tools.cli_wrapper')
+    if cli is not None:
+        cli._show_metadata_cached.cache_clear()
+        cli.cached_fetch_metadata.cache_clear()
+        cli._recent.clear()
+
+
 @pytest.fixture(autouse=True)
 def reset_singleton():
     """
     Reset singleton instances between tests
     """
-    # Reset semantic search singleton
-    import calibre_tools.semantic_search as ss
-    ss._instance = None
+    _reset_caches()
 
     yield
 
     # Clean up after test
-    ss._instance = None
+    _reset_caches()
 
 
 @pytest.fixture